@@ -0,0 +1,95 @@
+"""Ключи с версиями пространств имён и get-or-compute без лавины пересчётов.
+
+Базовые версии пространств лежат в CACHE_NAMESPACES и поднимаются при
+деплое; без деплоя пространство сбрасывает bump — счётчик хранится в самом
+кэше, поэтому сброс сразу видят все процессы.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import record_cache
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 0.05
+LOCK_ATTEMPTS = 20
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def version(namespace):
+    """Номер из настроек, после bump — с числом сбросов: 1, 1.1, 1.2."""
+    base = settings.CACHE_NAMESPACES.get(namespace, 1)
+    bumps = cache.get(_version_key(namespace))
+    return f'{base}.{bumps}' if bumps else str(base)
+
+
+def key(namespace, *parts):
+    """post_card:v1:feed:42 — с текущей версией пространства."""
+    return ':'.join([namespace, f'v{version(namespace)}', *map(str, parts)])
+
+
+def bump(namespace):
+    """Сбросить все ключи пространства и вернуть число сбросов."""
+    version_key = _version_key(namespace)
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        # Первый сброс: из двух процессов счётчик создаст один.
+        if cache.add(version_key, 1, None):
+            return 1
+        return cache.incr(version_key)
+
+
+def _is_fresh(expires, delta, beta):
+    # XFetch: чем дороже пересчёт и ближе срок, тем вероятнее ранний
+    # пересчёт, поэтому ключи одного срока не истекают разом.
+    return time.time() - delta * beta * math.log(1 - random.random()) < expires
+
+
+def _wait_for(cache_key):
+    for _ in range(LOCK_ATTEMPTS):
+        time.sleep(LOCK_WAIT)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(cache_key, compute, timeout, beta=1.0):
+    """Вернуть значение из кэша или вычислить его одним процессом.
+
+    Пока один процесс пересчитывает ключ под блокировкой cache.add,
+    остальные отдают старое значение, а при пустом кэше недолго ждут.
+    """
+    entry = cache.get(cache_key)
+    if entry is not None and _is_fresh(entry[2], entry[1], beta):
+        record_cache(hit=True)
+        return entry[0]
+    lock_key = f'{cache_key}:lock'
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is None:
+            entry = _wait_for(cache_key)
+        if entry is not None:
+            record_cache(hit=True)
+            return entry[0]
+    record_cache(hit=False)
+    try:
+        started = time.time()
+        value = compute()
+        delta = time.time() - started
+        cache.set(cache_key, (value, delta, time.time() + timeout), timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def delete(*cache_keys):
+    cache.delete_many(cache_keys)
@@ -0,0 +1,98 @@
+"""Сжатие ответов на лету: brotli или gzip по Accept-Encoding.
+
+brotli — необязательный пакет: без него клиенты получают gzip.
+"""
+import zlib
+from time import thread_time
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepted(header):
+    """{'br': 1.0, 'gzip': 0.5} из заголовка Accept-Encoding."""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate(header):
+    """Лучшая доступная кодировка из Accept-Encoding или None."""
+    accepted = _accepted(header)
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidates = [
+        name for name in available
+        if accepted.get(name, accepted.get('*', 0)) > 0
+    ]
+    return max(
+        candidates, key=lambda name: accepted.get(name, 0), default=None
+    )
+
+
+class Compressor:
+    """Потоковый компрессор; cpu_time — процессорное время на сжатие."""
+
+    def __init__(self, encoding):
+        self.cpu_time = 0.0
+        if encoding == 'br':
+            self.brotli = brotli.Compressor(
+                quality=settings.COMPRESS_BROTLI_QUALITY
+            )
+        else:
+            self.brotli = None
+            # wbits 31 — deflate в обёртке gzip.
+            self.zlib = zlib.compressobj(
+                settings.COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31
+            )
+
+    def _timed(self, brotli_call, zlib_call, *args):
+        started = thread_time()
+        try:
+            if self.brotli is not None:
+                return brotli_call(self.brotli, *args)
+            return zlib_call(self.zlib, *args)
+        finally:
+            self.cpu_time += thread_time() - started
+
+    def compress(self, data):
+        return self._timed(
+            lambda obj, data: obj.process(data),
+            lambda obj, data: obj.compress(data),
+            data
+        )
+
+    def flush(self):
+        """Отдать накопленное, чтобы клиент увидел уже отправленную часть."""
+        return self._timed(
+            lambda obj: obj.flush(),
+            lambda obj: obj.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        return self._timed(lambda obj: obj.finish(), lambda obj: obj.flush())
+
+
+def compress_stream(compressor, chunks, on_finish):
+    """Сжимать поток по кусочку; on_finish(cpu_time) — после последнего."""
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        on_finish(compressor.cpu_time)
@@ -0,0 +1,82 @@
+"""Число строк в лентах без COUNT(*) на каждый запрос.
+
+Политику выбирает место вызова через COUNT_POLICIES:
+
+* exact — честный COUNT(*) на каждый запрос;
+* cached — COUNT(*) раз в COUNT_TIMEOUT, между пересчётами значение
+  поправляют сигналы через adjust;
+* estimate — то же, но для всей таблицы значение берётся из статистики
+  планировщика (sqlite_stat1 после ANALYZE, pg_class.reltuples).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from . import cache as core_cache
+from .instrumentation import record_cache
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATE = 'estimate'
+
+
+def _key(site, parts):
+    return core_cache.key('count', site, *parts)
+
+
+def table_estimate(model, using='default'):
+    """Оценка числа строк таблицы по статистике БД или None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+                )
+                rows = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+                return max(rows, default=None)
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [table]
+                )
+                row = cursor.fetchone()
+                # -1: таблицу ещё не анализировали.
+                return int(row[0]) if row and row[0] >= 0 else None
+    except DatabaseError:
+        # sqlite_stat1 появляется только после первого ANALYZE.
+        return None
+    return None
+
+
+def count(site, queryset, *parts):
+    """Вернуть (число строк, приблизительно ли оно) для места вызова.
+
+    parts уточняют ключ кэша: count('group', posts, group.pk).
+    """
+    policy = settings.COUNT_POLICIES.get(site, EXACT)
+    if policy == EXACT:
+        return queryset.count(), False
+    cache_key = _key(site, parts)
+    value = cache.get(cache_key)
+    record_cache(hit=value is not None)
+    if value is None:
+        if policy == ESTIMATE and not queryset.query.where:
+            value = table_estimate(queryset.model, queryset.db)
+        if value is None:
+            value = queryset.count()
+        cache.add(cache_key, value, settings.COUNT_TIMEOUT)
+    return max(value, 0), True
+
+
+def adjust(site, *parts, delta):
+    """Поправить закэшированное значение; без значения нечего править."""
+    try:
+        cache.incr(_key(site, parts), delta)
+    except ValueError:
+        pass
+
+
+def forget(site, *parts):
+    cache.delete(_key(site, parts))
@@ -0,0 +1,215 @@
+"""Метрики запросов: SQL, шаблоны, кэш, задержка и бюджеты запросов.
+
+Метрики копятся в памяти процесса; Prometheus опрашивает /metrics/
+каждого воркера отдельно и суммирует ряды сам.
+"""
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+current = ContextVar('request_metrics', default=None)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNTERS = {
+    'queries': ('yatube_db_queries_total', 'SQL-запросы'),
+    'sql_time': ('yatube_db_query_seconds_total', 'Время SQL'),
+    'template_time': (
+        'yatube_template_render_seconds_total', 'Время рендера шаблонов'
+    ),
+    'cache_hits': ('yatube_cache_hits_total', 'Попадания в кэш'),
+    'cache_misses': ('yatube_cache_misses_total', 'Промахи кэша'),
+    'compress_time': (
+        'yatube_compression_seconds_total', 'Процессорное время сжатия'
+    ),
+    'over_budget': (
+        'yatube_query_budget_exceeded_total', 'Превышения бюджета запросов'
+    ),
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.compress_time = 0.0
+        self.over_budget = 0
+
+
+def query_budget(queries):
+    """Объявить, сколько SQL-запросов может сделать вью."""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def record_cache(hit):
+    metrics = current.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    metrics = current.get()
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.sql_time += perf_counter() - started
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        # Вложенные render_to_string (карточки постов) уже внутри замера.
+        if metrics is None or metrics.template_depth:
+            return super().render(context, request)
+        metrics.template_depth += 1
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            metrics.template_time += perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates, которые засекают время рендера для метрик."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.totals = defaultdict(float)
+        self.buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.latency = defaultdict(float)
+        self.count = defaultdict(int)
+
+    def observe(self, view, status, metrics, latency):
+        with self.lock:
+            self.requests[view, status] += 1
+            for name in COUNTERS:
+                self.totals[view, name] += getattr(metrics, name)
+            buckets = self.buckets[view]
+            for number, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    buckets[number] += 1
+            self.latency[view] += latency
+            self.count[view] += 1
+
+    def add(self, view, name, value):
+        """Досчитать счётчик после ответа, например сжатие потока."""
+        with self.lock:
+            self.totals[view, name] += value
+
+    def render(self):
+        lines = [
+            '# HELP yatube_requests_total Запросы по вью и статусу.',
+            '# TYPE yatube_requests_total counter',
+        ]
+        with self.lock:
+            for (view, status), value in sorted(self.requests.items()):
+                lines.append(
+                    f'yatube_requests_total{{view="{view}",'
+                    f'status="{status}"}} {value}'
+                )
+            for name, (metric, help_text) in COUNTERS.items():
+                lines += [
+                    f'# HELP {metric} {help_text}.',
+                    f'# TYPE {metric} counter',
+                ]
+                for view in sorted(self.count):
+                    lines.append(
+                        f'{metric}{{view="{view}"}} '
+                        f'{self.totals[view, name]:g}'
+                    )
+            metric = 'yatube_request_duration_seconds'
+            lines += [
+                f'# HELP {metric} Задержка ответа.',
+                f'# TYPE {metric} histogram',
+            ]
+            for view in sorted(self.count):
+                for bound, value in zip(LATENCY_BUCKETS, self.buckets[view]):
+                    lines.append(
+                        f'{metric}_bucket{{view="{view}",le="{bound}"}} '
+                        f'{value}'
+                    )
+                lines += [
+                    f'{metric}_bucket{{view="{view}",le="+Inf"}} '
+                    f'{self.count[view]}',
+                    f'{metric}_sum{{view="{view}"}} {self.latency[view]:g}',
+                    f'{metric}_count{{view="{view}"}} {self.count[view]}',
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unresolved'
+
+
+def report(request, response, metrics, latency):
+    """Записать метрики запроса и проверить бюджет запросов вью."""
+    match = request.resolver_match
+    view = view_name(request)
+    budget = getattr(match.func, 'query_budget', None) if match else None
+    if budget is not None and metrics.queries > budget:
+        metrics.over_budget = 1
+    registry.observe(view, response.status_code, metrics, latency)
+    record = {
+        'view': view,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'latency_ms': round(latency * 1000, 2),
+        'queries': metrics.queries,
+        'sql_ms': round(metrics.sql_time * 1000, 2),
+        'template_ms': round(metrics.template_time * 1000, 2),
+        'cache_hits': metrics.cache_hits,
+        'cache_misses': metrics.cache_misses,
+        'compress_ms': round(metrics.compress_time * 1000, 2),
+        'query_budget': budget,
+    }
+    if metrics.over_budget:
+        logger.warning(json.dumps(record))
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(
+                f'{view}: {metrics.queries} SQL-запросов '
+                f'при бюджете {budget}'
+            )
+    else:
+        logger.info(json.dumps(record))
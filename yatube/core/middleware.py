@@ -0,0 +1,129 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, instrumentation
+from .routers import SAFE_METHODS, pinned
+
+
+class ReadYourWritesMiddleware:
+    """Направляет чтения автора недавних изменений в основную базу.
+
+    Любой запрос с небезопасным методом (регистрация, смена пароля,
+    админка) читает с основной базы и ставит метку на следующие.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            request.wrote_to_primary = True
+        token = pinned.set(
+            getattr(request, 'wrote_to_primary', False)
+            or settings.DATABASE_PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            pinned.reset(token)
+        if getattr(request, 'wrote_to_primary', False):
+            response.set_cookie(
+                settings.DATABASE_PIN_COOKIE,
+                '1',
+                max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """Собирает метрики запроса, см. core.instrumentation."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(
+                        instrumentation.sql_wrapper
+                    ))
+                response = self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        instrumentation.report(
+            request, response, metrics, perf_counter() - started
+        )
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает HTML, JSON и прочий текст в brotli или gzip.
+
+    Стоит сразу после InstrumentationMiddleware: время сжатия обычного
+    ответа попадает в метрики запроса (compress_ms), а потокового —
+    в счётчик вью по мере отдачи, уже после записи лога.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(request, response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        compressor = compression.Compressor(encoding)
+        if response.streaming:
+            view = instrumentation.view_name(request)
+            response.streaming_content = compression.compress_stream(
+                compressor, response.streaming_content,
+                lambda cpu_time: instrumentation.registry.add(
+                    view, 'compress_time', cpu_time
+                )
+            )
+            del response['Content-Length']
+        else:
+            content = compressor.compress(response.content)
+            content += compressor.finish()
+            metrics = instrumentation.current.get()
+            if metrics is not None:
+                metrics.compress_time += compressor.cpu_time
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # Сжатое тело отличается побайтно, но не по смыслу.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, request, response):
+        if response.status_code != 200 or response.has_header(
+            'Content-Encoding'
+        ):
+            return False
+        if request.path.startswith(settings.COMPRESS_SKIP_PREFIXES):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type.strip() not in settings.COMPRESS_CONTENT_TYPES:
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.COMPRESS_MIN_SIZE
+        )
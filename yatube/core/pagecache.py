@@ -0,0 +1,135 @@
+"""Кэш целых страниц для анонимов с суррогатными ключами.
+
+Вью помечает ответ ключами (post:42, group:cats, author:7) через
+add_surrogate_keys, а изменения данных вызывают purge с теми же
+ключами. Каждый ключ хранит токен; страница в кэше помнит токены своих
+ключей и считается устаревшей, если хоть один сменился, поэтому сброс
+стоит одну запись на ключ, без списков страниц.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import cache as core_cache
+from .instrumentation import record_cache
+
+
+def _tag_key(key):
+    return core_cache.key('surrogate', key)
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return core_cache.key('page', path)
+
+
+def add_surrogate_keys(request, *keys, last_modified=None):
+    """Пометить ответ ключами и временем самого нового поста на странице."""
+    request.surrogate_keys = getattr(request, 'surrogate_keys', set())
+    request.surrogate_keys.update(keys)
+    if last_modified is not None:
+        previous = getattr(request, 'last_modified', None)
+        request.last_modified = max(previous or last_modified, last_modified)
+
+
+def purge(*keys):
+    token = time.time_ns()
+    cache.set_many(
+        {_tag_key(key): token for key in keys},
+        settings.PAGE_CACHE_TIMEOUT * 2
+    )
+
+
+def purge_on_commit(*keys, using=None):
+    """purge сейчас и ещё раз после фиксации транзакции.
+
+    Одного сброса до фиксации мало: параллельный запрос успеет
+    закэшировать страницу со старыми данными уже после него.
+    """
+    purge(*keys)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: purge(*keys), using)
+
+
+def _current_tokens(keys, started):
+    """Токены ключей; недостающие получают время начала рендера."""
+    tag_keys = {key: _tag_key(key) for key in keys}
+    found = cache.get_many(tag_keys.values())
+    missing = [key for key in tag_keys.values() if key not in found]
+    for tag_key in missing:
+        cache.add(tag_key, started, settings.PAGE_CACHE_TIMEOUT * 2)
+    if missing:
+        found.update(cache.get_many(missing))
+    return {key: found.get(tag_key) for key, tag_key in tag_keys.items()}
+
+
+def _is_valid(entry):
+    found = cache.get_many([_tag_key(key) for key in entry['tokens']])
+    return all(
+        found.get(_tag_key(key)) == token
+        for key, token in entry['tokens'].items()
+    )
+
+
+def _conditional(request, response, entry):
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_cache_control(response, public=True, max_age=0)
+    return get_conditional_response(
+        request,
+        etag=entry['etag'],
+        last_modified=entry['last_modified'],
+        response=response
+    ) or response
+
+
+def cache_anonymous_page(view):
+    """Отдавать анонимам страницу из кэша, ETag/Last-Modified дают 304."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        page_key = _page_key(request)
+        entry = cache.get(page_key)
+        if entry is not None and _is_valid(entry):
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type']
+            )
+            response['X-Page-Cache'] = 'hit'
+            record_cache(hit=True)
+            return _conditional(request, response, entry)
+        record_cache(hit=False)
+        started = time.time_ns()
+        response = view(request, *args, **kwargs)
+        keys = getattr(request, 'surrogate_keys', None)
+        if response.status_code != 200 or response.cookies or not keys:
+            return response
+        tokens = _current_tokens(keys, started)
+        if any(
+            token is None or token > started for token in tokens.values()
+        ):
+            # Данные сменились во время рендера: страница уже устарела.
+            return response
+        last_modified = getattr(request, 'last_modified', None)
+        entry = {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': '"%s"' % hashlib.md5(response.content).hexdigest(),
+            'last_modified': last_modified and int(last_modified.timestamp()),
+            'tokens': tokens,
+        }
+        cache.set(page_key, entry, settings.PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'miss'
+        return _conditional(request, response, entry)
+    return wrapper
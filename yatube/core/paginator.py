@@ -0,0 +1,212 @@
+import math
+from types import SimpleNamespace
+
+from django.core import signing
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'core.paginator.cursor'
+LAST_PAGE = 'last'
+# Номера в навигации: первая, соседние (по курсорам) и последняя
+# (по ключу с конца) — ни одна ссылка не ведёт на OFFSET.
+ON_EACH_SIDE = 1
+ON_ENDS = 1
+# ?page=N читает OFFSET (N - 1) * per_page строк; дальше — InvalidPage.
+MAX_OFFSET_PAGE = 5
+
+
+class CursorPaginator(Paginator):
+    """Keyset пагинатор: страница выбирается по ключу сортировки.
+
+    Вместо OFFSET и COUNT(*) запрашивается per_page + 1 строк после
+    (или до) последней показанной записи, поэтому любая страница стоит
+    столько же, сколько первая. Номер страницы путешествует в курсоре
+    только для отображения.
+
+    COUNT(*) не выполняется никогда: total — необязательная оценка числа
+    строк (счётчик или статистика БД), по ней строится навигация
+    с последней страницей и подпись «из ~N».
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-created', '-id'),
+                 total=None, approximate=False, **kwargs):
+        self.ordering = tuple(ordering)
+        self.total = total
+        self.approximate = approximate
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs
+        )
+        self._num_pages = 1
+
+    @cached_property
+    def key_fields(self):
+        opts = self.object_list.model._meta
+        return [
+            (opts.get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    @property
+    def page_range(self):
+        return range(1, self._num_pages + 1)
+
+    @property
+    def estimated_pages(self):
+        """Число страниц по total или None, если оценки нет."""
+        if self.total is None:
+            return None
+        return max(math.ceil(self.total / self.per_page), self._num_pages)
+
+    def page_window(self, page):
+        """Номера страниц для навигации, None на месте пропуска «…».
+
+        Первые ON_ENDS страниц, ON_EACH_SIDE вокруг текущей и последняя,
+        если её номер можно оценить. На каждую ведёт курсор или ключ
+        с конца, поэтому краулер по ним не уйдёт в глубокий OFFSET.
+        """
+        last = page.number
+        if page.has_next():
+            last = self.estimated_pages or page.number + 1
+        numbers = {
+            *range(1, min(ON_ENDS, last) + 1),
+            *range(
+                max(page.number - ON_EACH_SIDE, 1),
+                min(page.number + ON_EACH_SIDE, last) + 1
+            ),
+            last,
+        }
+        window, previous = [], 0
+        for number in sorted(numbers):
+            if number - previous > 1:
+                window.append(None)
+            window.append(number)
+            previous = number
+        return window
+
+    def encode_cursor(self, obj, number, direction):
+        if isinstance(obj, dict):
+            # Строки из .values(): поля ключа сортировки лежат по именам.
+            obj = SimpleNamespace(**obj)
+        values = [field.value_to_string(obj) for field, _ in self.key_fields]
+        return signing.dumps(
+            {'v': values, 'n': number, 'd': direction},
+            salt=CURSOR_SALT,
+            compress=True
+        )
+
+    def decode_cursor(self, token):
+        data = signing.loads(token, salt=CURSOR_SALT)
+        values = [
+            field.to_python(value)
+            for (field, _), value in zip(self.key_fields, data['v'])
+        ]
+        return values, int(data['n']), data['d']
+
+    def _seek_filter(self, values, forward):
+        condition = Q()
+        for position, (field, descending) in enumerate(self.key_fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field.name}__{lookup}': values[position]})
+            for (prev_field, _), prev_value in zip(
+                self.key_fields[:position], values
+            ):
+                step &= Q(**{prev_field.name: prev_value})
+            condition |= step
+        return condition
+
+    def _order(self, forward):
+        if forward:
+            return self.ordering
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def cursor_page(self, token=None):
+        """Вернуть страницу по курсору; без курсора — первую страницу."""
+        values, number, direction = None, 1, 'next'
+        if token:
+            try:
+                values, number, direction = self.decode_cursor(token)
+            except (signing.BadSignature, KeyError, ValueError, TypeError):
+                values, number, direction = None, 1, 'next'
+        forward = direction != 'prev'
+        queryset = self.object_list.order_by(*self._order(forward))
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            self._num_pages = number + 1 if has_more else number
+        else:
+            rows.reverse()
+            number = max(number, 2) if has_more else 1
+            self._num_pages = number + 1
+        return self._build_page(rows, number)
+
+    def offset_page(self, number):
+        """Совместимость со ссылками вида ?page=N без подсчёта строк.
+
+        Номера больше MAX_OFFSET_PAGE — InvalidPage: глубже листают
+        курсорами, а подменять страницу первой под чужим адресом нельзя.
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if number > MAX_OFFSET_PAGE:
+            raise InvalidPage(
+                f'Страницы дальше {MAX_OFFSET_PAGE} по номеру нет'
+            )
+        bottom = (number - 1) * self.per_page
+        queryset = self.object_list.order_by(*self.ordering)
+        rows = list(queryset[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self.offset_page(1)
+        has_more = len(rows) > self.per_page
+        self._num_pages = number + 1 if has_more else number
+        return self._build_page(rows[:self.per_page], number)
+
+    def last_page(self):
+        """Последняя страница по ключу с конца, без OFFSET и COUNT(*)."""
+        queryset = self.object_list.order_by(*self._order(False))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        number = 1
+        if has_more:
+            number = max(self.estimated_pages or 2, 2)
+        self._num_pages = number
+        return self._build_page(rows, number)
+
+    def get_page(self, number=None, cursor=None):
+        if cursor or not number:
+            return self.cursor_page(cursor)
+        if number == LAST_PAGE:
+            return self.last_page()
+        return self.offset_page(number)
+
+    def page(self, number):
+        return self.offset_page(number)
+
+    def _build_page(self, rows, number):
+        page = Page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        page.window = self.page_window(page)
+        if rows:
+            if page.has_next():
+                page.next_cursor = self.encode_cursor(
+                    rows[-1], number + 1, 'next'
+                )
+            if page.has_previous():
+                page.previous_cursor = self.encode_cursor(
+                    rows[0], number - 1, 'prev'
+                )
+        return page
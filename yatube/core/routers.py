@@ -0,0 +1,49 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Сессию читают сразу после записи, отставание реплики разлогинит.
+# django_cache — таблица CACHE_BACKEND=db: версии пространств, сбросы
+# страниц и блокировки core.cache должны читаться там же, где пишутся.
+PRIMARY_ONLY_APPS = {'sessions', 'django_cache'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+# Запрос закреплён за основной базой: пишет сам или недавно писал.
+pinned = ContextVar('pinned', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Запись в основную базу, чтение с реплик из DATABASE_REPLICAS."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            pinned.get()
+            or not settings.DATABASE_REPLICAS
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+        ):
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def read_your_writes(view):
+    """Читать с основной базы в этом запросе и несколько секунд после.
+
+    Метку для следующих запросов ставит ReadYourWritesMiddleware
+    в cookie, пока реплики догоняют основную базу. POST и прочие
+    небезопасные методы закрепляются им и без декоратора; он нужен
+    представлениям, которые пишут по GET.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pinned.set(True)
+        request.wrote_to_primary = True
+        return view(request, *args, **kwargs)
+    return wrapper
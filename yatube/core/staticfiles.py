@@ -0,0 +1,172 @@
+"""Сборка статики: хеши в именах, вырезанный Bootstrap и сжатые копии.
+
+manage.py collectstatic с CompressedManifestStaticFilesStorage:
+
+* убирает из STATIC_PURGE_CSS правила с классами, которых нет
+  в шаблонах (и в STATIC_PURGE_SAFELIST);
+* кладёт файлы под именами с хешем содержимого, их можно кэшировать
+  навсегда (Cache-Control: immutable);
+* рядом с текстовыми файлами пишет .gz и, если установлен пакет
+  brotli, .br — сервер отдаёт их без сжатия на лету.
+"""
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.template import engines
+
+from .warmup import template_directories, template_names
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.ico', '.json', '.map', '.txt', '.html', '.xml'
+)
+NESTED_AT_RULES = ('@media', '@supports', '@document', '@layer')
+CLASS_ATTRIBUTE_RE = re.compile(
+    r'''class=(?:"([^"]*)"|'([^']*)')|addclass:['"]([^'"]*)['"]'''
+)
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+CSS_TOKEN_RE = re.compile(
+    r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|[{};]', re.S
+)
+SELECTOR_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+NOT_RE = re.compile(r':not\((?:[^()]|\([^()]*\))*\)')
+
+
+def used_classes():
+    """CSS-классы, которые встречаются в шаблонах всех движков."""
+    classes = set(settings.STATIC_PURGE_SAFELIST)
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for directory in template_directories(engine):
+            for name in template_names(directory):
+                path = os.path.join(directory, name)
+                with open(path, encoding='utf-8', errors='ignore') as file:
+                    text = file.read()
+                for groups in CLASS_ATTRIBUTE_RE.findall(text):
+                    value = TEMPLATE_TAG_RE.sub(' ', ''.join(groups))
+                    classes.update(re.findall(r'[\w-]+', value))
+    return classes
+
+
+def _split_rules(css):
+    """Правила верхнего уровня: (селектор, тело) или (текст, None)."""
+    rules, start, depth, brace = [], 0, 0, 0
+    for match in CSS_TOKEN_RE.finditer(css):
+        token = match.group()
+        if token.startswith('/*'):
+            # Лицензии /*! ... */ сохраняются, прочие комментарии — нет.
+            if depth == 0 and not css[start:match.start()].strip():
+                if token.startswith('/*!'):
+                    rules.append((token, None))
+                start = match.end()
+        elif token == '{':
+            if depth == 0:
+                brace = match.start()
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                body = css[brace + 1:match.start()]
+                rules.append((css[start:brace].strip(), body))
+                start = match.end()
+        elif token == ';' and depth == 0:
+            rules.append((css[start:match.end()].strip(), None))
+            start = match.end()
+    return rules
+
+
+def _split_selectors(prelude):
+    selectors, start, depth = [], 0, 0
+    for position, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:position])
+            start = position + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def _is_used(selector, classes):
+    # .btn:not(.disabled) нужен, даже если класса disabled нигде нет.
+    return all(
+        name in classes
+        for name in SELECTOR_CLASS_RE.findall(NOT_RE.sub('', selector))
+    )
+
+
+def purge_css(css, classes):
+    """Оставить правила, все классы селектора которых есть в classes."""
+    result = []
+    for prelude, body in _split_rules(css):
+        if body is None:
+            result.append(prelude)
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = purge_css(body, classes)
+            if inner:
+                result.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            result.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector for selector in _split_selectors(prelude)
+                if _is_used(selector, classes)
+            ]
+            if selectors:
+                result.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(result)
+
+
+def compressed_variants(data):
+    """Сжатые копии файла, которые меньше оригинала: {'.gz': bytes}."""
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {
+        suffix: content for suffix, content in variants.items()
+        if len(content) < len(data)
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+        purged = [name for name in settings.STATIC_PURGE_CSS if name in paths]
+        if purged:
+            classes = used_classes()
+        for name in purged:
+            with self.open(name) as file:
+                css = file.read().decode('utf-8')
+            self.delete(name)
+            self._save(name, ContentFile(purge_css(css, classes).encode()))
+            # Хеш считается по уже вырезанной копии в STATIC_ROOT.
+            paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+        for name in set(self.hashed_files.values()):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.lower().endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < settings.STATIC_COMPRESS_MIN_SIZE:
+            return
+        for suffix, content in compressed_variants(data).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(content))
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+# Отдельная SQLite-база, а не зеркало default: тесты маршрутизации
+# видят, в какую из баз на самом деле ушёл запрос. Создаётся, только
+# если она указана в databases у теста.
+TEST_REPLICA = 'test_replica'
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """В тестах превышение бюджета запросов вью — ошибка, а не лог."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_RAISE = True
+        connections.databases.setdefault(TEST_REPLICA, {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        })
+        connections.ensure_defaults(TEST_REPLICA)
+        connections.prepare_test_settings(TEST_REPLICA)
+
+
+@contextmanager
+def run_on_commit(using='default'):
+    """Выполнить on_commit-колбэки, набранные внутри блока.
+
+    TestCase не фиксирует свою транзакцию, и без этого сбросы кэшей
+    из сигналов в тестах не срабатывали бы вовсе.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
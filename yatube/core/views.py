@@ -1,4 +1,17 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.static import serve
+
+from .instrumentation import registry
 
 
 def page_not_found(request, exception):
@@ -15,3 +28,60 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def serve_media(request, path, document_root=None):
+    """Отдача media в dev-режиме с вечным кэшем для неизменяемых файлов."""
+    response = serve(request, path, document_root=document_root)
+    response['Cache-Control'] = settings.MEDIA_CACHE_CONTROL
+    return response
+
+
+def serve_static(request, path, document_root=None):
+    """Статика с готовыми .br/.gz и вечным кэшем для имён с хешем."""
+    served = path
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accepted and os.path.exists(
+            safe_join(document_root, path + suffix)
+        ):
+            served = path + suffix
+            break
+    response = serve(request, served, document_root=document_root)
+    if served != path:
+        response['Content-Type'] = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    hashed = getattr(staticfiles_storage, 'hashed_files', {}).values()
+    if path in hashed:
+        response['Cache-Control'] = settings.STATIC_CACHE_CONTROL
+    return response
+
+
+def metrics_allowed(request):
+    """Персонал или сборщик с заголовком Authorization: Bearer METRICS_TOKEN.
+
+    Адрес клиента не проверяется: за nginx на той же машине все запросы
+    приходят с 127.0.0.1.
+    """
+    if request.user.is_staff:
+        return True
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(
+        ' '
+    )
+    return bool(
+        settings.METRICS_TOKEN
+        and scheme.lower() == 'bearer'
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
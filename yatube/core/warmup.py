@@ -0,0 +1,44 @@
+"""Прогрев воркера до первого запроса.
+
+С кэширующим загрузчиком шаблон компилируется при первом обращении
+и живёт в памяти процесса, поэтому первый посетитель после деплоя
+ждал бы разбора всех шаблонов страницы. warm_templates компилирует их
+заранее; wsgi.py вызывает её в каждом воркере при TEMPLATE_WARMUP.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_directories(engine):
+    """Каталоги шаблонов движка вместе с templates/ приложений."""
+    return [*engine.dirs, *get_app_template_dirs('templates')]
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Скомпилировать все шаблоны движков и вернуть их число."""
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for directory in template_directories(engine):
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except (TemplateSyntaxError, UnicodeDecodeError):
+                    logger.warning('Шаблон %s не скомпилирован', name)
+                else:
+                    compiled += 1
+    return compiled
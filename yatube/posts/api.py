@@ -0,0 +1,156 @@
+"""JSON-версии лент для мобильного клиента.
+
+Посты читаются через .values() только с запрошенными полями и
+сериализуются словарями без моделей и шаблонов. Листание — курсором
+из core.paginator, ответы несут ETag и отдают 304 на If-None-Match.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from core import pagecache
+from core.instrumentation import query_budget
+from core.paginator import CursorPaginator
+
+from . import pages, timeline
+from .models import Group, Post, User
+from .utils import POSTS_PER_PAGE
+
+# Поле ответа -> поле для values().
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+# Ключ курсора нужен всегда, даже если клиент его не просил.
+CURSOR_FIELDS = ('id', 'created')
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def _json(request, data, status=200):
+    response = JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+    patch_vary_headers(response, ('Cookie',))
+    if status != 200:
+        return response
+    etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+    response['ETag'] = etag
+    return get_conditional_response(
+        request, etag=etag, response=response
+    ) or response
+
+
+def api_view(view):
+    """Ошибки отдаются JSON: 400 для ?fields=, 404 для ленты."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except FieldsError as error:
+            return _json(request, {'error': str(error)}, status=400)
+        except Http404:
+            return _json(request, {'error': 'Не найдено'}, status=404)
+    return wrapper
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json(
+                request, {'error': 'Нужна авторизация'}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request):
+    """Поля из ?fields=id,text,author; без параметра — все."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown or not names:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(FIELDS)}'
+        )
+    return names
+
+
+def serialize(row, names):
+    item = {}
+    for name in names:
+        value = row[FIELDS[name]]
+        if name == 'created':
+            value = value.isoformat()
+        elif name == 'image':
+            value = IMAGE_STORAGE.url(value) if value else None
+        item[name] = value
+    return item
+
+
+def feed(request, posts, *keys):
+    names = requested_fields(request)
+    columns = {FIELDS[name] for name in names} | set(CURSOR_FIELDS)
+    page = CursorPaginator(
+        posts.values(*columns), POSTS_PER_PAGE
+    ).cursor_page(request.GET.get('cursor'))
+    pagecache.add_surrogate_keys(
+        request,
+        *keys,
+        *(pages.post_key(row['id']) for row in page),
+        last_modified=max((row['created'] for row in page), default=None)
+    )
+    return _json(request, {
+        'results': [serialize(row, names) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+# Бюджеты с двумя запросами сессии и пользователя: cache_anonymous_page
+# читает request.user и у залогиненного клиента.
+@query_budget(3)
+@pagecache.cache_anonymous_page
+@api_view
+def index(request):
+    return feed(request, Post.objects.all(), pages.INDEX)
+
+
+@query_budget(4)
+@pagecache.cache_anonymous_page
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return feed(request, group.posts.all(), pages.group_key(group.pk))
+
+
+@query_budget(4)
+@pagecache.cache_anonymous_page
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return feed(request, author.posts.all(), pages.author_key(author.pk))
+
+
+@query_budget(4)
+@api_login_required
+@api_view
+def follow_index(request):
+    return feed(request, timeline.follow_feed(request.user))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from core import cache
+
+CARD_TEMPLATES = {
+    'feed': 'posts/includes/post_card.html',
+    'detail': 'posts/includes/post_body.html',
+}
+
+
+def card_key(post_id, variant):
+    return cache.key('post_card', variant, post_id)
+
+
+def render_card(post, variant='feed'):
+    return cache.get_or_compute(
+        card_key(post.pk, variant),
+        lambda: render_to_string(CARD_TEMPLATES[variant], {'post': post}),
+        settings.POST_CARD_CACHE_TIMEOUT
+    )
+
+
+def invalidate_cards(post_ids):
+    cache.delete(*[
+        card_key(post_id, variant)
+        for post_id in post_ids
+        for variant in CARD_TEMPLATES
+    ])
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+
+def _shift(name, delta):
+    if delta < 0:
+        return Greatest(F(name) + delta, Value(0))
+    return F(name) + delta
+
+
+def bump_author(user_id, **deltas):
+    """Атомарно сдвинуть счётчики автора: bump_author(1, posts_count=1).
+
+    Строка статистики создаётся только при росте счётчиков: при каскадном
+    удалении пользователя она может быть уже удалена.
+    """
+    changes = {name: _shift(name, delta) for name, delta in deltas.items()}
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        if stats.update(**changes) or min(deltas.values()) < 0:
+            return
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        stats.update(**changes)
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shift('comments_count', delta)
+    )
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(user=user)
+        return stats
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), Value(0))
+
+
+@transaction.atomic
+def recount():
+    """Пересчитать все счётчики по данным таблиц и вернуть число авторов."""
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        batch_size=1000
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+        comments_count=_count(Comment, 'author'),
+    )
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    return AuthorStats.objects.count()
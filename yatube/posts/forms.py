@@ -1,5 +1,6 @@
+from django import forms
 from django.forms import ModelForm
-from .models import Post, Comment
+from .models import Post, Comment, Group, User
 
 
 class PostForm(ModelForm):
@@ -12,3 +13,23 @@ class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = ('text', )
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise forms.ValidationError('Такого автора нет')
@@ -0,0 +1,233 @@
+import json
+import random
+import subprocess
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+SAMPLE = 500
+# Эти адреса пишут в базу: их прогон откатывается, см. rolled_back.
+MUTATING = {'add_comment', 'profile_follow', 'profile_unfollow'}
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+@contextmanager
+def rolled_back():
+    """Выполнить блок в транзакциях на всех базах и откатить их."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in connections:
+            transaction.set_rollback(True, using=alias)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет все адреса posts/urls.py через тестовый клиент и пишет '
+        'p50/p95/p99, запросы к БД и пропускную способность в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый адрес'
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def sample(self, queryset, field='pk'):
+        values = list(queryset.values_list(field, flat=True)[:SAMPLE])
+        if not values:
+            raise CommandError(
+                'Нет данных: сначала запустите manage.py seed_benchmark'
+            )
+        return values
+
+    def scenarios(self):
+        """Имя адреса -> (клиент, метод, функция, возвращающая url и data)."""
+        posts = self.sample(Post.objects.order_by('-comments_count'))
+        authors = self.sample(
+            User.objects.order_by('-stats__followers_count'), 'username'
+        )
+        groups = self.sample(Group.objects.all(), 'slug')
+        # Читатель с лентой и своим постом: замер не должен ничего создавать.
+        own_post = Post.objects.filter(
+            author__follower__isnull=False
+        ).select_related('author').first()
+        if own_post is None:
+            raise CommandError(
+                'Нет данных: сначала запустите manage.py seed_benchmark'
+            )
+        guest = Client()
+        member = self.member = Client()
+        member.force_login(own_post.author)
+        choice = self.random.choice
+        return {
+            'index': (guest, 'get', lambda: (reverse('posts:index'), {})),
+            'group_list': (guest, 'get', lambda: (reverse(
+                'posts:group_list', kwargs={'slug': choice(groups)}
+            ), {})),
+            'profile': (guest, 'get', lambda: (reverse(
+                'posts:profile', kwargs={'username': choice(authors)}
+            ), {})),
+            'post_detail': (guest, 'get', lambda: (reverse(
+                'posts:post_detail', kwargs={'post_id': choice(posts)}
+            ), {})),
+            'post_comments': (guest, 'get', lambda: (reverse(
+                'posts:post_comments', kwargs={'post_id': choice(posts)}
+            ), {})),
+            'search': (guest, 'get', lambda: (
+                reverse('posts:search'), {'q': choice(['кот', 'день', 'мир'])}
+            )),
+            'create': (member, 'get', lambda: (reverse('posts:create'), {})),
+            'post_edit': (member, 'get', lambda: (reverse(
+                'posts:post_edit', kwargs={'post_id': own_post.pk}
+            ), {})),
+            'add_comment': (member, 'post', lambda: (reverse(
+                'posts:add_comment', kwargs={'post_id': choice(posts)}
+            ), {'text': 'benchmark'})),
+            'follow_index': (member, 'get', lambda: (
+                reverse('posts:follow_index'), {}
+            )),
+            'profile_follow': (member, 'get', lambda: (reverse(
+                'posts:profile_follow', kwargs={'username': choice(authors)}
+            ), {})),
+            'profile_unfollow': (member, 'get', lambda: (reverse(
+                'posts:profile_unfollow', kwargs={'username': choice(authors)}
+            ), {})),
+            'api_index': (guest, 'get', lambda: (
+                reverse('posts:api_index'), {}
+            )),
+            'api_group_list': (guest, 'get', lambda: (reverse(
+                'posts:api_group_list', kwargs={'slug': choice(groups)}
+            ), {})),
+            'api_profile': (guest, 'get', lambda: (reverse(
+                'posts:api_profile', kwargs={'username': choice(authors)}
+            ), {'fields': 'id,text,created'})),
+            'api_follow_index': (member, 'get', lambda: (
+                reverse('posts:api_follow_index'), {}
+            )),
+        }
+
+    def measure(self, client, method, target, count, cold):
+        latencies, queries, errors = [], [], 0
+        started = perf_counter()
+        for _ in range(count):
+            url, data = target()
+            if cold:
+                cache.clear()
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(
+                        CaptureQueriesContext(connections[alias])
+                    )
+                    for alias in connections
+                ]
+                request_started = perf_counter()
+                response = getattr(client, method)(url, data)
+                latencies.append(perf_counter() - request_started)
+            queries.append(sum(map(len, captured)))
+            errors += response.status_code >= 400
+        elapsed = perf_counter() - started
+        latencies.sort()
+        return {
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_queries': round(sum(queries) / count, 2),
+            'max_queries': max(queries),
+            'throughput_rps': round(count / elapsed, 1),
+            'errors': errors,
+        }
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        results = {}
+        for name, (client, method, target) in self.scenarios().items():
+            with ExitStack() as stack:
+                if name in MUTATING:
+                    # После отката: кэш заполнялся данными транзакции.
+                    stack.callback(cache.clear)
+                    stack.enter_context(rolled_back())
+                for _ in range(options['warmup']):
+                    url, data = target()
+                    getattr(client, method)(url, data)
+                results[name] = self.measure(
+                    client, method, target, options['requests'],
+                    options['cold']
+                )
+            self.stdout.write(f'{name}: {results[name]}')
+        self.member.logout()
+        report = {
+            'commit': git_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'cold_cache': options['cold'],
+            'requests': options['requests'],
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'
+        ))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as previous_file:
+            previous = json.load(previous_file)['results']
+        for name, current in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (
+                (current['p95_ms'] - before['p95_ms'])
+                / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            )
+            self.stdout.write(
+                f'{name}: p95 {before["p95_ms"]} -> {current["p95_ms"]} мс '
+                f'({change:+.1f}%), запросов {before["mean_queries"]} -> '
+                f'{current["mean_queries"]}'
+            )
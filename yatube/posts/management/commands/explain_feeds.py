@@ -0,0 +1,91 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Post
+from posts.utils import COMMENTS_ORDERING, COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+FEED_ORDERING = ('-created', '-id')
+# Индексы до 0019_feed_indexes: одиночные индексы внешних ключей.
+BASELINE_SQL = (
+    'DROP INDEX post_author_created_idx',
+    'DROP INDEX post_group_created_idx',
+    'DROP INDEX comment_post_created_idx',
+    'CREATE INDEX baseline_post_author ON posts_post (author_id)',
+    'CREATE INDEX baseline_post_group ON posts_post (group_id)',
+    'CREATE INDEX baseline_comment_post ON posts_comment (post_id)',
+)
+
+
+def busiest(queryset, field):
+    row = (
+        queryset.values(field)
+        .annotate(total=Count('pk'))
+        .order_by('-total')
+        .first()
+    )
+    return row and row[field]
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы и время запросов лент'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Повторить замеры с индексами до миграции 0019 '
+                 '(в откатываемой транзакции)'
+        )
+
+    def queries(self):
+        posts = Post.objects.order_by(*FEED_ORDERING)
+        queries = {'index': posts[:POSTS_PER_PAGE]}
+        author_id = busiest(Post.objects, 'author')
+        if author_id:
+            queries['profile'] = posts.filter(
+                author_id=author_id
+            )[:POSTS_PER_PAGE]
+        group_id = busiest(Post.objects.filter(group__isnull=False), 'group')
+        if group_id:
+            queries['group_posts'] = posts.filter(
+                group_id=group_id
+            )[:POSTS_PER_PAGE]
+        post_id = busiest(Comment.objects, 'post')
+        if post_id:
+            queries['post_detail comments'] = Comment.objects.filter(
+                post_id=post_id
+            ).order_by(*COMMENTS_ORDERING)[:COMMENTS_PER_PAGE]
+        follow = Follow.objects.first()
+        if follow:
+            queries['follow lookup'] = Follow.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            ).values('pk')[:1]
+        return queries
+
+    def report(self, title, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in queries.items():
+            started = perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (perf_counter() - started) / repeat * 1000
+            self.stdout.write(f'{name}: {elapsed:.3f} мс')
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
+
+    def handle(self, *args, **options):
+        queries = self.queries()
+        self.report('Текущие индексы', queries, options['repeat'])
+        if not options['compare']:
+            return
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for sql in BASELINE_SQL:
+                    cursor.execute(sql)
+            queries.pop('follow lookup', None)
+            self.report('Индексы до 0019', queries, options['repeat'])
+            transaction.set_rollback(True)
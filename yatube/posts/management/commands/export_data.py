@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в JSONL/CSV '
+        'потоком, не загружая таблицу в память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.MODELS))
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--after-id', type=int, default=0,
+            help='Продолжить выгрузку после этого id, дописывая в файл'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = transfer.detect_format(path, options['format'])
+        resume = bool(options['after_id'])
+        rows = transfer.export_rows(
+            options['kind'], options['after_id'], options['chunk_size']
+        )
+        if path == '-':
+            self.export(sys.stdout, format, options, rows, header=not resume)
+            return
+        with open(path, 'a' if resume else 'w', encoding='utf-8',
+                  newline='') as file:
+            self.export(file, format, options, rows, header=not resume)
+
+    def export(self, file, format, options, rows, header):
+        done = 0
+        for done in transfer.write_rows(
+            file, format, options['kind'], rows, header
+        ):
+            if done % options['chunk_size'] == 0:
+                self.stderr.write(f'\rВыгружено: {done}', ending='')
+        self.stderr.write(f'\rВыгружено: {done}')
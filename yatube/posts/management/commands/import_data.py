@@ -0,0 +1,81 @@
+import os
+from itertools import islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL/CSV '
+        'пачками bulk_create; прерванный импорт продолжается с --resume'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.MODELS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images-dir',
+            help='Откуда брать картинки с относительными путями '
+                 '(по умолчанию каталог файла)'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Пропустить строки, загруженные прошлым запуском'
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поиск после загрузки'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        progress_path = f'{path}.progress'
+        skip = 0
+        if options['resume'] and os.path.exists(progress_path):
+            with open(progress_path) as progress:
+                skip = int(progress.read() or 0)
+        images_dir = options['images_dir'] or os.path.dirname(
+            os.path.abspath(path)
+        )
+        done = skip
+        started = perf_counter()
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = transfer.read_rows(
+                file, transfer.detect_format(path, options['format'])
+            )
+            batches = transfer.import_rows(
+                options['kind'], islice(rows, skip, None),
+                options['batch_size'], images_dir
+            )
+            try:
+                for count in batches:
+                    done += count
+                    self.save_progress(progress_path, done)
+                    rate = (done - skip) / (perf_counter() - started)
+                    self.stdout.write(
+                        f'\rЗагружено: {done} ({rate:.0f} строк/с)',
+                        ending=''
+                    )
+            except (KeyError, ValueError, OSError) as error:
+                raise CommandError(
+                    f'Ошибка после строки {done}: {error!r}; исправьте '
+                    f'файл и запустите с --resume'
+                )
+        self.stdout.write('')
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        if not options['no_rebuild']:
+            self.stdout.write('Пересчёт счётчиков, лент и поиска…')
+            transfer.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(f'Готово: строк {done}'))
+
+    def save_progress(self, path, done):
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as progress:
+            progress.write(str(done))
+        os.replace(temp_path, path)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит варианты для уже загруженных картинок media/posts/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Количество потоков'
+        )
+        parser.add_argument(
+            '--enqueue-only',
+            action='store_true',
+            help='Только поставить в очередь для process_thumbnails'
+        )
+
+    def handle(self, *args, **options):
+        names = list(thumbnails.image_names())
+        thumbnails.schedule(*names, process_now=False)
+        self.stdout.write(f'В очередь поставлено картинок: {len(names)}')
+        if not options['enqueue_only']:
+            call_command(
+                'process_thumbnails',
+                workers=options['workers'],
+                stdout=self.stdout
+            )
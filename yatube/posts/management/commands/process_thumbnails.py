@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Фоновый обработчик очереди миниатюр'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Количество потоков'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а ждать новых заданий'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Пауза между опросами очереди, секунд'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            done = thumbnails.process(workers=options['workers'])
+            total += done
+            if done:
+                self.stdout.write(f'Обработано картинок: {total}')
+            elif options['loop']:
+                time.sleep(options['interval'])
+            else:
+                break
+        self.stdout.write(self.style.SUCCESS(
+            f'Очередь миниатюр пуста, обработано {total}'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        documents = search.get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'В поисковом индексе {documents} постов'
+        ))
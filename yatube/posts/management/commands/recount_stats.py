@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def handle(self, *args, **options):
+        authors = counters.recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны для {authors} авторов'
+        ))
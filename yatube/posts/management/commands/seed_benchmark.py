@@ -0,0 +1,147 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME_PREFIX = 'bench_'
+TEXT_POOL = 5000
+PERIOD = timedelta(days=365)
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса: первые по рангу встречаются чаще остальных."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу данными для бенчмарка: пользователи, группы, '
+        'посты, подписки со степенным распределением и комментарии'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=3_000_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для популярности авторов'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'\r{label}: {done}/{total}', ending='')
+        if done >= total:
+            self.stdout.write('')
+
+    def batches(self, label, total, make):
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            yield [make() for _ in range(size)]
+            done += size
+            self.progress(label, done, total)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        texts = [fake.paragraph(nb_sentences=4) for _ in range(TEXT_POOL)]
+        now = timezone.now()
+
+        def created():
+            return now - PERIOD * self.random.random()
+
+        password = make_password(None)
+        start = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).count()
+        numbers = iter(range(start, start + options['users']))
+        for batch in self.batches('Пользователи', options['users'], lambda: (
+            User(
+                username=f'{USERNAME_PREFIX}{next(numbers)}',
+                password=password
+            )
+        )):
+            User.objects.bulk_create(batch)
+        # Ранг автора — его место в случайной перестановке пользователей.
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        self.random.shuffle(user_ids)
+        weights = zipf_weights(len(user_ids), options['skew'])
+
+        Group.objects.bulk_create([
+            Group(
+                title=fake.word().capitalize(),
+                slug=f'bench-{start}-{number}',
+                description=fake.sentence()
+            )
+            for number in range(options['groups'])
+        ])
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+
+        with transfer.manual_created(Post, Comment), transaction.atomic():
+            for batch in self.batches('Посты', options['posts'], lambda: Post(
+                text=self.random.choice(texts),
+                author_id=self.random.choices(
+                    user_ids, cum_weights=weights
+                )[0],
+                group_id=(
+                    self.random.choice(group_ids)
+                    if group_ids and self.random.random() < 0.7 else None
+                ),
+                created=created()
+            )):
+                Post.objects.bulk_create(batch)
+
+            follows = options['users'] * options['follows']
+            for batch in self.batches('Подписки', follows, lambda: Follow(
+                user_id=self.random.choice(user_ids),
+                author_id=self.random.choices(
+                    user_ids, cum_weights=weights
+                )[0]
+            )):
+                Follow.objects.bulk_create(
+                    [f for f in batch if f.user_id != f.author_id],
+                    ignore_conflicts=True
+                )
+
+            # Обсуждения скошены: основная часть комментариев у малой доли
+            # постов.
+            post_ids = list(Post.objects.order_by('?').values_list(
+                'pk', flat=True
+            )[:100_000])
+            post_weights = zipf_weights(len(post_ids), options['skew'])
+            for batch in self.batches(
+                'Комментарии', options['comments'], lambda: Comment(
+                    post_id=self.random.choices(
+                        post_ids, cum_weights=post_weights
+                    )[0],
+                    author_id=self.random.choice(user_ids),
+                    text=self.random.choice(texts)[:500],
+                    created=created()
+                )
+            ):
+                Comment.objects.bulk_create(batch)
+
+        self.stdout.write('Пересчёт счётчиков, лент и поиска…')
+        entries = transfer.rebuild_derived()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: записей в лентах {entries}'
+        ))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, comments, tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_INDEX = (
+    "INSERT INTO posts_post_fts(rowid, text, comments) "
+    "SELECT p.id, p.text, COALESCE(("
+    "SELECT group_concat(c.text, char(10)) "
+    "FROM posts_comment c WHERE c.post_id = p.id"
+    "), '') FROM posts_post p"
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(FILL_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,46 @@
+from importlib import import_module
+
+from django.db import migrations
+
+previous = import_module('posts.migrations.0018_post_search_index')
+
+# Пост и каждый его комментарий — отдельные строки индекса: rowid поста
+# равен его id, комментария — минус id комментария.
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, comments, post_id UNINDEXED, "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_INDEX = (
+    "INSERT INTO posts_post_fts(rowid, text, comments, post_id) "
+    "SELECT id, text, '', id FROM posts_post",
+    "INSERT INTO posts_post_fts(rowid, text, comments, post_id) "
+    "SELECT -id, '', text, post_id FROM posts_comment",
+)
+
+
+def split_documents(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    schema_editor.execute(CREATE_INDEX)
+    for sql in FILL_INDEX:
+        schema_editor.execute(sql)
+
+
+def join_documents(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    previous.create_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_documents, join_documents),
+    ]
@@ -1,9 +1,99 @@
-from django.db import models
+from django.db import connections, models, router
+from django.db.models.signals import post_delete, post_save
 from core.models import DateTimeModel
+from core.storage import ContentAddressedStorage
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+FEED_FIELDS = (
+    'id',
+    'text',
+    'created',
+    'image',
+    'image_digest',
+    'comments_count',
+    'author__id',
+    'author__username',
+    'group__id',
+    'group__slug',
+    'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты с автором и группой одним запросом и только нужными полями."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+COMMENT_FIELDS = (
+    'id',
+    'text',
+    'created',
+    'post_id',
+    'author__id',
+    'author__username',
+)
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_thread(self):
+        """Комментарии вместе с авторами одним запросом."""
+        return self.select_related('author').only(*COMMENT_FIELDS)
+
+
+class FollowQuerySet(models.QuerySet):
+    """Подписка и отписка одним запросом, повторы ничего не меняют.
+
+    Гонку между воркерами решает уникальный индекс (user, author):
+    INSERT ... ON CONFLICT DO NOTHING и DELETE затрагивают строку только
+    если состояние действительно изменилось, и только тогда по rowcount
+    отправляются сигналы со счётчиками и лентой. RETURNING не нужен:
+    он требует SQLite 3.35, а ON CONFLICT — 3.24.
+    """
+
+    @property
+    def write_db(self):
+        # self.db без явного using() — это база для чтения, то есть реплика.
+        return self._db or router.db_for_write(self.model)
+
+    def _execute(self, sql, user, author):
+        table = self.model._meta.db_table
+        with connections[self.write_db].cursor() as cursor:
+            cursor.execute(sql.format(table=table), [user.pk, author.pk])
+            changed = cursor.rowcount > 0
+        # Сигналам нужны только user_id и author_id.
+        return changed and self.model(user_id=user.pk, author_id=author.pk)
+
+    def follow(self, user, author):
+        """Подписать user на author и вернуть состояние подписки."""
+        if user.pk == author.pk:
+            return False
+        follow = self._execute(
+            'INSERT INTO {table} (user_id, author_id) VALUES (%s, %s) '
+            'ON CONFLICT (user_id, author_id) DO NOTHING',
+            user, author
+        )
+        if follow:
+            post_save.send(
+                sender=self.model, instance=follow, created=True,
+                update_fields=None, raw=False, using=self.write_db
+            )
+        return True
+
+    def unfollow(self, user, author):
+        """Отписать user от author и вернуть состояние подписки."""
+        follow = self._execute(
+            'DELETE FROM {table} WHERE user_id = %s AND author_id = %s',
+            user, author
+        )
+        if follow:
+            post_delete.send(
+                sender=self.model, instance=follow, using=self.write_db
+            )
+        return False
+
 
 class Post(DateTimeModel):
     text = models.TextField(
@@ -13,23 +103,40 @@ class Post(DateTimeModel):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True
+    )
+    image_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False
     )
+    # Одиночные индексы FK покрыты составными индексами из Meta.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     group = models.ForeignKey(
         'Group',
         blank=True,
         null=True,
         on_delete=models.SET_NULL,
+        db_index=False,
         related_name='posts',
         verbose_name='Группы поста',
         help_text='Группа, к которой будет относиться пост'
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -37,6 +144,17 @@ class Post(DateTimeModel):
     class Meta():
         ordering = ['-created']
         verbose_name = 'Пост'
+        # Ленты фильтруют по автору или группе и листают по (-created, -id).
+        indexes = [
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', '-created', '-id'],
+                name='post_group_created_idx'
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -53,6 +171,7 @@ class Comment(models.Model):
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -67,6 +186,16 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -80,9 +209,77 @@ class Follow(models.Model):
         related_name='following'
     )
 
-    def follow_can_be_created(user, author):
-        following_exists = Follow.objects.filter(
-            author=author,
-            user=user
-        ).exists()
-        return (user != author and not following_exists)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
+    objects = FollowQuerySet.as_manager()
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+
+    def __str__(self) -> str:
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created']
+        unique_together = ('user', 'post')
+        # Лента подписок листается по (-created, -post) записей читателя.
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-post'],
+                name='timeline_user_created_idx'
+            ),
+            models.Index(fields=['user', 'author']),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    image = models.CharField(max_length=255, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # Метка обработчика, который взял задание, см. thumbnails.claim.
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self) -> str:
+        return self.image
@@ -0,0 +1,37 @@
+"""Суррогатные ключи страниц постов для core.pagecache."""
+from core import pagecache
+
+INDEX = 'index'
+
+
+def post_key(post_id):
+    return f'post:{post_id}'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def tag_page(request, posts, *keys):
+    """Пометить страницу ключами её постов и временем самого нового."""
+    posts = list(posts)
+    pagecache.add_surrogate_keys(
+        request,
+        *keys,
+        *(post_key(post.pk) for post in posts),
+        last_modified=max((post.created for post in posts), default=None)
+    )
+
+
+def purge_post(post, *group_ids, listed=False):
+    """Сбросить страницы поста; listed — пост появился или пропал из лент."""
+    keys = [post_key(post.pk)]
+    if listed:
+        keys += [INDEX, author_key(post.author_id)]
+        group_ids += (post.group_id,)
+    keys += [group_key(group_id) for group_id in group_ids if group_id]
+    pagecache.purge_on_commit(*keys)
@@ -0,0 +1,275 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+
+WORD_RE = re.compile(r'\w+')
+# Маркеры подсветки: вставляются до экранирования, затем меняются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_WORDS = 32
+SNIPPET_CHARS = 200
+# Бэкенды по умолчанию для connection.vendor; остальным — DatabaseBackend.
+VENDOR_BACKENDS = {'sqlite': 'posts.search.SqliteFtsBackend'}
+
+
+def words(query):
+    return WORD_RE.findall(query.lower())[:settings.SEARCH_MAX_WORDS]
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Ленивая выдача для Paginator: count() и срезы идут в бэкенд."""
+
+    def __init__(self, backend, query, group=None, author=None):
+        self.backend = backend
+        self.words = words(query)
+        self.filters = {
+            'group_id': getattr(group, 'pk', group),
+            'author_id': getattr(author, 'pk', author),
+        }
+
+    @cached_property
+    def total(self):
+        if not self.words:
+            return 0
+        return self.backend.count(self.words, **self.filters)
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        limit = (key.stop if key.stop is not None else self.total) - offset
+        if not self.words or limit <= 0:
+            return []
+        hits = self.backend.hits(self.words, offset, limit, **self.filters)
+        posts = Post.objects.for_feed().in_bulk([pk for pk, _ in hits])
+        results = []
+        for pk, snippet in hits:
+            if pk in posts:
+                posts[pk].snippet = highlight(snippet)
+                results.append(posts[pk])
+        return results
+
+
+class BaseBackend:
+    def index(self, post_ids):
+        """Обновить документы постов после изменения их текста."""
+
+    def remove(self, post_ids):
+        """Убрать удалённые посты из индекса."""
+
+    def index_comments(self, comment_ids):
+        """Добавить или обновить комментарии в индексе."""
+
+    def remove_comments(self, comment_ids):
+        """Убрать удалённые комментарии из индекса."""
+
+    def rebuild(self):
+        """Построить индекс заново и вернуть число постов в нём."""
+        return 0
+
+    def count(self, words, group_id=None, author_id=None):
+        raise NotImplementedError
+
+    def hits(self, words, offset, limit, group_id=None, author_id=None):
+        """Пары (id поста, фрагмент с маркерами) по убыванию релевантности."""
+        raise NotImplementedError
+
+    def search(self, query, group=None, author=None):
+        return SearchResults(self, query, group=group, author=author)
+
+
+class DatabaseBackend(BaseBackend):
+    """Поиск через LIKE для любых СУБД: без индекса и ранжирования."""
+
+    def queryset(self, words, group_id=None, author_id=None):
+        posts = Post.objects.all()
+        for word in words:
+            posts = posts.filter(
+                Q(text__icontains=word)
+                | Q(pk__in=Comment.objects.filter(
+                    text__icontains=word
+                ).values('post_id'))
+            )
+        if group_id:
+            posts = posts.filter(group_id=group_id)
+        if author_id:
+            posts = posts.filter(author_id=author_id)
+        return posts
+
+    def count(self, words, **filters):
+        return self.queryset(words, **filters).count()
+
+    def hits(self, words, offset, limit, **filters):
+        posts = self.queryset(words, **filters).order_by('-created', '-id')
+        pattern = re.compile(
+            '|'.join(re.escape(word) for word in words), re.IGNORECASE
+        )
+        return [
+            (pk, self.snippet(text, pattern))
+            for pk, text in posts.values_list('pk', 'text')[
+                offset:offset + limit
+            ]
+        ]
+
+    def snippet(self, text, pattern):
+        match = pattern.search(text)
+        start = max(match.start() - SNIPPET_CHARS // 4, 0) if match else 0
+        fragment = text[start:start + SNIPPET_CHARS]
+        fragment = pattern.sub(
+            lambda found: MARK_START + found.group() + MARK_END, fragment
+        )
+        return ('…' if start else '') + fragment
+
+
+class SqliteFtsBackend(BaseBackend):
+    """Индекс FTS5: текст поста и его комментарии, ранжирование bm25.
+
+    Таблица создаётся миграциями 0018 и 0020. Пост и каждый комментарий
+    лежат отдельными строками (rowid поста — его id, комментария — минус
+    id), поэтому комментарий индексируется и удаляется одной строкой,
+    сколько бы их ни было у поста.
+    """
+
+    table = 'posts_post_fts'
+    # Вес совпадений в тексте поста и в комментариях.
+    weights = (1.0, 0.4)
+
+    @property
+    def posts_sql(self):
+        return (
+            f'INSERT INTO {self.table}(rowid, text, comments, post_id) '
+            f'SELECT id, text, \'\', id FROM {Post._meta.db_table}'
+        )
+
+    @property
+    def comments_sql(self):
+        return (
+            f'INSERT INTO {self.table}(rowid, text, comments, post_id) '
+            f'SELECT -id, \'\', text, post_id '
+            f'FROM {Comment._meta.db_table}'
+        )
+
+    def _in(self, ids):
+        return ', '.join(str(int(pk)) for pk in ids)
+
+    def _delete(self, rowids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ({self._in(rowids)})'
+            )
+
+    def _fill(self, sql, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} WHERE id IN ({self._in(ids)})')
+
+    def remove(self, post_ids):
+        # Строки комментариев убирают сигналы удаления самих комментариев.
+        post_ids = list(post_ids)
+        if post_ids:
+            self._delete(post_ids)
+
+    def index(self, post_ids):
+        post_ids = list(post_ids)
+        if post_ids:
+            self._delete(post_ids)
+            self._fill(self.posts_sql, post_ids)
+
+    def remove_comments(self, comment_ids):
+        comment_ids = list(comment_ids)
+        if comment_ids:
+            self._delete(-pk for pk in comment_ids)
+
+    def index_comments(self, comment_ids):
+        comment_ids = list(comment_ids)
+        if comment_ids:
+            self._delete(-pk for pk in comment_ids)
+            self._fill(self.comments_sql, comment_ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(self.posts_sql)
+            cursor.execute(self.comments_sql)
+            cursor.execute(
+                f'SELECT count(*) FROM {self.table} WHERE rowid > 0'
+            )
+            return cursor.fetchone()[0]
+
+    def match(self, words):
+        # Слова из \w+ не содержат кавычек; каждое ищется как префикс.
+        return ' OR '.join(f'"{word}"*' for word in words)
+
+    def _where(self, words, group_id, author_id):
+        """Посты, где каждое слово есть в тексте или в комментариях."""
+        matching = ' INTERSECT '.join(
+            [f'SELECT post_id FROM {self.table} WHERE {self.table} MATCH %s']
+            * len(words)
+        )
+        where = [f'p.id IN ({matching})']
+        params = [self.match([word]) for word in words]
+        if group_id:
+            where.append('p.group_id = %s')
+            params.append(group_id)
+        if author_id:
+            where.append('p.author_id = %s')
+            params.append(author_id)
+        return f'WHERE {" AND ".join(where)}', params
+
+    def count(self, words, group_id=None, author_id=None):
+        sql, params = self._where(words, group_id, author_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {Post._meta.db_table} p {sql}', params
+            )
+            return cursor.fetchone()[0]
+
+    def hits(self, words, offset, limit, group_id=None, author_id=None):
+        sql, params = self._where(words, group_id, author_id)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # Пост ранжируется по лучшей своей строке, фрагмент берётся из неё:
+        # в SQLite столбцы рядом с min() берутся из строки с минимумом.
+        # LIMIT -1 не даёт встроить подзапрос в GROUP BY, где bm25
+        # и snippet недоступны.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT f.post_id, f.fragment, min(f.rank) AS best '
+                f'FROM (SELECT post_id, bm25({self.table}, {weights}) '
+                f'AS rank, snippet({self.table}, -1, %s, %s, \'…\', '
+                f'{SNIPPET_WORDS}) AS fragment FROM {self.table} '
+                f'WHERE {self.table} MATCH %s LIMIT -1) f '
+                f'JOIN {Post._meta.db_table} p ON p.id = f.post_id {sql} '
+                f'GROUP BY f.post_id ORDER BY best, p.created DESC '
+                f'LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, self.match(words), *params,
+                 limit, offset]
+            )
+            return [(pk, fragment) for pk, fragment, _ in cursor.fetchall()]
+
+
+def get_backend():
+    path = settings.POST_SEARCH_BACKEND or VENDOR_BACKENDS.get(
+        connection.vendor, 'posts.search.DatabaseBackend'
+    )
+    return import_string(path)()
@@ -0,0 +1,142 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core import counting, pagecache
+
+from . import cards, counters, pages, search, thumbnails, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def after_commit(func, *args, **kwargs):
+    """Кэши и счётчики в кэше трогаются только после фиксации записи."""
+    transaction.on_commit(partial(func, *args, **kwargs))
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False,
+                        update_fields=None, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+        pagecache.purge_on_commit(pages.author_key(instance.pk))
+    elif update_fields is None or 'username' in update_fields:
+        post_ids = list(instance.posts.values_list('pk', flat=True))
+        after_commit(cards.invalidate_cards, post_ids)
+        pagecache.purge_on_commit(
+            pages.author_key(instance.pk), *map(pages.post_key, post_ids)
+        )
+
+
+def release_image_on_commit(name):
+    after_commit(thumbnails.release, name)
+
+
+def count_in_feeds(group_id, delta, index=True):
+    """Поправить закэшированные размеры лент, см. core.counting."""
+    if index:
+        after_commit(counting.adjust, 'index', delta=delta)
+    if group_id:
+        after_commit(counting.adjust, 'group', group_id, delta=delta)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._loaded_image = instance.__dict__.get('image')
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    after_commit(cards.invalidate_cards, [instance.pk])
+    previous = str(instance._loaded_image or '')
+    image_changed = previous != (instance.image.name or '')
+    if settings.THUMBNAIL_PREGENERATE and instance.image and image_changed:
+        thumbnails.schedule(instance.image.name)
+    if previous and image_changed:
+        release_image_on_commit(previous)
+    instance._loaded_image = instance.image.name
+    if created:
+        pages.purge_post(instance, listed=True)
+        count_in_feeds(instance.group_id, 1)
+    else:
+        pages.purge_post(
+            instance, instance._loaded_group_id, instance.group_id
+        )
+        if instance._loaded_group_id != instance.group_id:
+            count_in_feeds(instance._loaded_group_id, -1, index=False)
+            count_in_feeds(instance.group_id, 1, index=False)
+    instance._loaded_group_id = instance.group_id
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or 'text' in update_fields:
+        search.get_backend().index([instance.pk])
+    if created:
+        counters.bump_author(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    after_commit(cards.invalidate_cards, [instance.pk])
+    if instance.image:
+        release_image_on_commit(instance.image.name)
+    search.get_backend().remove([instance.pk])
+    pages.purge_post(instance, listed=True)
+    count_in_feeds(instance.group_id, -1)
+    counters.bump_author(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_cards(sender, instance, created=False, **kwargs):
+    post_ids = [] if created else list(
+        instance.posts.values_list('pk', flat=True)
+    )
+    after_commit(cards.invalidate_cards, post_ids)
+    pagecache.purge_on_commit(
+        pages.group_key(instance.pk), *map(pages.post_key, post_ids)
+    )
+    if not created:
+        after_commit(counting.forget, 'group', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or 'text' in update_fields:
+        search.get_backend().index_comments([instance.pk])
+    pagecache.purge_on_commit(pages.post_key(instance.post_id))
+    if created:
+        counters.bump_author(instance.author_id, comments_count=1)
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment(sender, instance, **kwargs):
+    search.get_backend().remove_comments([instance.pk])
+    pagecache.purge_on_commit(pages.post_key(instance.post_id))
+    counters.bump_author(instance.author_id, comments_count=-1)
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    pagecache.purge_on_commit(pages.author_key(instance.author_id))
+    if created:
+        counters.bump_author(instance.author_id, followers_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        timeline.followers_changed(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    pagecache.purge_on_commit(pages.author_key(instance.author_id))
+    counters.bump_author(instance.author_id, followers_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+    timeline.trim(instance.user_id, instance.author_id)
+    timeline.followers_changed(instance.author_id, -1)
@@ -0,0 +1,24 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import variants
+from posts.cards import render_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post, variant='feed'):
+    return mark_safe(render_card(post, variant))
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(post):
+    sources = []
+    if post.image and post.image_digest:
+        sources = variants.sources(post.image_digest)
+    return {
+        'post': post,
+        'sources': sources[:-1],
+        'fallback': sources[-1][1] if sources else None,
+    }
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from ..models import Follow, Group, Post
+from ..utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='cats', slug='cats', description='cats'
+        )
+        Post.objects.bulk_create([
+            Post(text=f'post {number}', author=cls.author, group=cls.group)
+            for number in range(POSTS_PER_PAGE + 3)
+        ])
+        Follow.objects.follow(cls.reader, cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_return_posts(self):
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': 'cats'}),
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+                self.assertEqual(data['results'][0]['author'], 'author')
+                self.assertEqual(data['results'][0]['group'], 'cats')
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_logged_in_feeds_fit_budget(self):
+        self.client.force_login(FeedApiTests.reader)
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': 'cats'}),
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            reverse('posts:api_follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_sparse_fields(self):
+        data = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,text'}
+        ).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_cursor_walks_all_posts(self):
+        url = reverse('posts:api_index')
+        first = self.client.get(url, {'fields': 'id'}).json()
+        second = self.client.get(
+            url, {'fields': 'id', 'cursor': first['next']}
+        ).json()
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), POSTS_PER_PAGE + 3)
+        self.assertIsNone(second['next'])
+        back = self.client.get(
+            url, {'fields': 'id', 'cursor': second['previous']}
+        ).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_etag_gives_not_modified(self):
+        self.client.force_login(FeedApiTests.reader)
+        url = reverse('posts:api_follow_index')
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), POSTS_PER_PAGE)
+        not_modified = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        Post.objects.create(text='new', author=FeedApiTests.author)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            200
+        )
+
+    def test_anonymous_feed_is_cached(self):
+        url = reverse('posts:api_index')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_errors_are_json(self):
+        self.assertEqual(
+            self.client.get(reverse('posts:api_follow_index')).status_code,
+            401
+        )
+        response = self.client.get(
+            reverse('posts:api_profile', kwargs={'username': 'nobody'})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import Comment, Follow, Post, TimelineEntry, User
+
+
+class BenchmarkTests(TestCase):
+    # Команда считает запросы ко всем базам из connections.
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark', users=20, posts=60, comments=40, groups=3,
+            follows=3, batch_size=10, stdout=StringIO()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_creates_dataset(self):
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench_').count(), 20
+        )
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_rebuild_matches_follows(self):
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user_id=follow.user_id).count(),
+            Post.objects.filter(
+                author__following__user_id=follow.user_id
+            ).count()
+        )
+
+    def test_benchmark_writes_results(self):
+        counts = [
+            model.objects.count() for model in (Post, Comment, Follow)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'result.json')
+            call_command(
+                'benchmark_views', requests=3, warmup=1, output=output,
+                stdout=StringIO()
+            )
+            call_command(
+                'benchmark_views', requests=2, warmup=0, cold=True,
+                output=output, compare=output, stdout=StringIO()
+            )
+            with open(output, encoding='utf-8') as result:
+                report = json.load(result)
+        self.assertEqual(report['dataset']['posts'], Post.objects.count())
+        self.assertEqual(
+            [model.objects.count() for model in (Post, Comment, Follow)],
+            counts
+        )
+        self.assertEqual(len(report['results']), 16)
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
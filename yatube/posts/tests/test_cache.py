@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+
+from core import cache
+
+
+class CoreCacheTests(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_key_uses_namespace_version(self):
+        self.assertEqual(
+            cache.key('post_card', 'feed', 1), 'post_card:v1:feed:1'
+        )
+        with override_settings(CACHE_NAMESPACES={'post_card': 2}):
+            self.assertEqual(
+                cache.key('post_card', 'feed', 1), 'post_card:v2:feed:1'
+            )
+
+    def test_bump_changes_namespace_version(self):
+        old_key = cache.key('post_card', 'feed', 1)
+        cache.get_or_compute(old_key, self.compute, 60)
+        self.assertEqual(cache.bump('post_card'), 1)
+        self.assertEqual(cache.bump('post_card'), 2)
+        new_key = cache.key('post_card', 'feed', 1)
+        self.assertEqual(new_key, 'post_card:v1.2:feed:1')
+        self.assertEqual(cache.get_or_compute(new_key, self.compute, 60), 2)
+        self.assertEqual(cache.key('timeline', 'x'), 'timeline:v1:x')
+        with override_settings(CACHE_NAMESPACES={'post_card': 3}):
+            self.assertEqual(
+                cache.key('post_card', 'feed', 1), 'post_card:v3.2:feed:1'
+            )
+
+    def test_value_is_computed_once(self):
+        for _ in range(3):
+            self.assertEqual(cache.get_or_compute('k', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_entry_is_recomputed(self):
+        django_cache.set('k', ('old', 0.1, time.time() - 1), 60)
+        self.assertEqual(cache.get_or_compute('k', self.compute, 60), 1)
+
+    def test_stale_value_is_served_while_locked(self):
+        django_cache.set('k', ('old', 0.1, time.time() - 1), 60)
+        django_cache.add('k:lock', 1, 60)
+        self.assertEqual(cache.get_or_compute('k', self.compute, 60), 'old')
+        self.assertEqual(self.calls, 0)
+
+    def test_delete(self):
+        cache.get_or_compute('k', self.compute, 60)
+        cache.delete('k')
+        self.assertEqual(cache.get_or_compute('k', self.compute, 60), 2)
@@ -0,0 +1,126 @@
+import gzip
+import json
+import zlib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+
+from core.compression import negotiate
+from core.instrumentation import registry
+from core.middleware import CompressionMiddleware
+from ..models import Post
+
+User = get_user_model()
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_encoding_is_chosen_by_quality(self):
+        for header, expected in (
+            ('gzip, deflate, br', 'br'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('deflate, *;q=0.5', 'br'),
+            ('gzip;q=0, br;q=0', None),
+            ('identity', None),
+            ('', None),
+        ):
+            with self.subTest(header=header):
+                with mock.patch('core.compression.brotli', mock.Mock()):
+                    self.assertEqual(negotiate(header), expected)
+
+    def test_gzip_without_brotli_package(self):
+        with mock.patch('core.compression.brotli', None):
+            self.assertEqual(negotiate('br, gzip;q=0.5'), 'gzip')
+            self.assertIsNone(negotiate('br'))
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def run_middleware(self, response, path='/', **headers):
+        request = RequestFactory().get(
+            path, HTTP_ACCEPT_ENCODING='gzip', **headers
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.run_middleware(HttpResponse('<p>короткий</p>'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESS_MIN_SIZE=0)
+    def test_media_and_images_are_skipped(self):
+        for path, content_type in (
+            ('/media/posts/a.svg', 'image/svg+xml'),
+            ('/', 'image/jpeg'),
+        ):
+            with self.subTest(path=path, content_type=content_type):
+                response = self.run_middleware(
+                    HttpResponse(b'x' * 2048, content_type=content_type),
+                    path
+                )
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_chunk_by_chunk(self):
+        chunks = [f'<p>пост {number}</p>' * 50 for number in range(5)]
+        response = self.run_middleware(StreamingHttpResponse(chunks))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        decompressor = zlib.decompressobj(31)
+        first = next(iter(response.streaming_content))
+        # Первый кусок отдаётся сразу, а не после всего потока.
+        self.assertEqual(
+            decompressor.decompress(first).decode(), chunks[0]
+        )
+        rest = b''.join(response.streaming_content)
+        self.assertEqual(
+            decompressor.decompress(rest).decode(), ''.join(chunks[1:])
+        )
+
+
+@mock.patch('core.compression.brotli', None)
+class CompressedPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Сжимаемый пост ' * 20, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_page_is_gzipped_when_accepted(self):
+        plain = self.client.get('/')
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 2)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertIn('compress_ms', record)
+
+    def test_compressed_etag_still_revalidates(self):
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get(
+            '/', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_compression_time_is_exported(self):
+        self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertGreater(
+            registry.totals['posts:index', 'compress_time'], 0
+        )
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertContains(
+            response, 'yatube_compression_seconds_total{view="posts:index"}'
+        )
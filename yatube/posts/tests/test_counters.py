@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(text='foo', author=self.author)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter_follows_create_and_delete(self):
+        Post.objects.create(text='bar', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_comment_counters(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='baz'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_repeated_follow_and_unfollow_count_once(self):
+        for _ in range(2):
+            Follow.objects.follow(self.reader, self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        for _ in range(2):
+            Follow.objects.unfollow(self.reader, self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_cascade_delete_of_author(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='baz')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(AuthorStats.objects.filter(
+            user_id=self.author.pk
+        ).exists())
+
+    def test_recount_stats_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='baz')
+        AuthorStats.objects.update(posts_count=42, comments_count=7)
+        Post.objects.update(comments_count=9)
+        call_command('recount_stats', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
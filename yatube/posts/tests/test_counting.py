@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from core import counting
+from core.testing import run_on_commit
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(COUNT_POLICIES={'index': 'estimate', 'group': 'cached'})
+class CountingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Group.objects.create(title='cats', slug='cats')
+        cls.dogs = Group.objects.create(title='dogs', slug='dogs')
+        for _ in range(3):
+            Post.objects.create(text='foo', author=cls.author, group=cls.cats)
+
+    def setUp(self):
+        cache.clear()
+
+    def group_count(self, group):
+        return counting.count('group', group.posts.all(), group.pk)
+
+    def test_unknown_site_counts_exactly(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                counting.count('other', Post.objects.all()), (3, False)
+            )
+
+    def test_cached_count_is_adjusted_by_signals(self):
+        self.assertEqual(self.group_count(self.cats), (3, True))
+        with run_on_commit():
+            post = Post.objects.create(
+                text='bar', author=self.author, group=self.cats
+            )
+            # До фиксации кэш хранит прежнее значение.
+            self.assertEqual(self.group_count(self.cats), (3, True))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.cats), (4, True))
+        self.group_count(self.dogs)
+        post.group = self.dogs
+        with run_on_commit():
+            post.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.cats), (3, True))
+            self.assertEqual(self.group_count(self.dogs), (1, True))
+        with run_on_commit():
+            post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.dogs), (0, True))
+
+    def test_index_estimate_comes_from_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(counting.table_estimate(Post), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                counting.count('index', Post.objects.all()), (3, True)
+            )
+        with run_on_commit():
+            Post.objects.create(text='bar', author=self.author)
+        self.assertEqual(
+            counting.count('index', Post.objects.all()), (4, True)
+        )
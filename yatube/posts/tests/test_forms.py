@@ -1,20 +1,38 @@
+import hashlib
+import os
 import shutil
 import tempfile
+from io import StringIO
 
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from http import HTTPStatus
 from django.test import TestCase, Client, override_settings
-from ..models import Post, Group, Comment
+from ..models import Post, Group, Comment, ThumbnailJob
+from .. import thumbnails, variants
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from core.testing import run_on_commit
+
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+SMALL_GIF_DIGEST = hashlib.sha256(SMALL_GIF).hexdigest()
+SMALL_GIF_NAME = f'posts/{SMALL_GIF_DIGEST[:2]}/{SMALL_GIF_DIGEST}.gif'
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -47,6 +65,8 @@ class PostCreateFormTest(TestCase):
     def tearDown(self):
         super().tearDown()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        # Одинаковые загрузки получают одно имя, а sorl помнит миниатюры.
+        cache.clear()
 
     def test_form_post_create(self):
         posts_count = Post.objects.count()
@@ -133,17 +153,9 @@ class PostCreateFormTest(TestCase):
         self.assertEqual(new_post, HTTPStatus.NOT_FOUND)
 
     def test_creating_post_with_image(self):
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif'
         )
         form_data = {
@@ -159,9 +171,159 @@ class PostCreateFormTest(TestCase):
         self.assertTrue(Post.objects.filter(
             text='post_with_image',
             group=PostCreateFormTest.group.id,
-            image='posts/small.gif'
+            image=SMALL_GIF_NAME
         ).exists())
 
+    def test_thumbnails_are_pregenerated_on_upload(self):
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        PostCreateFormTest.authorized_client.post(
+            reverse('posts:create'),
+            data={'text': 'thumb', 'image': uploaded}
+        )
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=SMALL_GIF_NAME).exists()
+        )
+        url = reverse('posts:index')
+        response = PostCreateFormTest.authorized_client.get(url)
+        self.assertContains(response, SMALL_GIF_NAME)
+        self.assertNotContains(response, '<picture>')
+        thumbnails.process(workers=1)
+        self.assertFalse(ThumbnailJob.objects.exists())
+        response = PostCreateFormTest.authorized_client.get(url)
+        self.assertContains(response, '<picture>')
+
+    @override_settings(THUMBNAIL_WORKER=False)
+    def test_variants_are_built_after_commit_without_worker(self):
+        with run_on_commit():
+            post = self.upload('inline')
+        self.assertFalse(ThumbnailJob.objects.exists())
+        post.refresh_from_db()
+        self.assertEqual(post.image_digest, SMALL_GIF_DIGEST)
+
+    def test_text_edit_does_not_requeue_image(self):
+        post = self.upload('with image')
+        thumbnails.process(workers=1)
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'edited'
+        post.save()
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    @override_settings(THUMBNAIL_WORKER=True)
+    def test_worker_mode_leaves_jobs_queued(self):
+        with run_on_commit():
+            self.upload('queued')
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=SMALL_GIF_NAME).exists()
+        )
+
+    def test_claimed_jobs_are_skipped_by_other_workers(self):
+        ThumbnailJob.objects.create(image='posts/one.gif')
+        ThumbnailJob.objects.create(image='posts/two.gif')
+        first = thumbnails.claim(batch_size=1)
+        second = thumbnails.claim(batch_size=10)
+        self.assertEqual([name for _, name in first], ['posts/one.gif'])
+        self.assertEqual([name for _, name in second], ['posts/two.gif'])
+        self.assertEqual(thumbnails.claim(batch_size=10), [])
+        with self.settings(THUMBNAIL_CLAIM_TIMEOUT=-1):
+            self.assertEqual(len(thumbnails.claim(batch_size=10)), 2)
+
+    def test_failed_jobs_are_kept_for_retry(self):
+        job = ThumbnailJob.objects.create(image='posts/missing.gif')
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertEqual(thumbnails.process(workers=1), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(thumbnails.process(workers=1), 0)
+        with self.settings(THUMBNAIL_CLAIM_TIMEOUT=-1):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                self.assertEqual(thumbnails.process(workers=1), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, 2)
+            with self.settings(THUMBNAIL_MAX_ATTEMPTS=2):
+                self.assertEqual(thumbnails.process(workers=1), 0)
+        self.assertTrue(ThumbnailJob.objects.filter(pk=job.pk).exists())
+
+    def test_responsive_variants_are_stored_by_digest(self):
+        uploaded = SimpleUploadedFile(
+            name='variants.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        PostCreateFormTest.authorized_client.post(
+            reverse('posts:create'),
+            data={'text': 'variants', 'image': uploaded}
+        )
+        thumbnails.process(workers=1)
+        post = Post.objects.get(text='variants')
+        digest = SMALL_GIF_DIGEST
+        self.assertEqual(post.image_digest, digest)
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            with self.subTest(width=width):
+                name = variants.variant_name(digest, width, 'jpeg')
+                self.assertTrue(
+                    os.path.isfile(os.path.join(TEMP_MEDIA_ROOT, name))
+                )
+        response = PostCreateFormTest.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, f'{digest}/960.jpg 960w')
+
+    def upload(self, text, name='small.gif'):
+        PostCreateFormTest.authorized_client.post(
+            reverse('posts:create'),
+            data={
+                'text': text,
+                'image': SimpleUploadedFile(
+                    name=name, content=SMALL_GIF, content_type='image/gif'
+                )
+            }
+        )
+        return Post.objects.get(text=text)
+
+    def test_same_image_is_stored_once(self):
+        first = self.upload('first', 'one.gif')
+        second = self.upload('second', 'two.gif')
+        self.assertEqual(first.image.name, SMALL_GIF_NAME)
+        self.assertEqual(second.image.name, SMALL_GIF_NAME)
+        directory = os.path.join(
+            TEMP_MEDIA_ROOT, 'posts', SMALL_GIF_DIGEST[:2]
+        )
+        self.assertEqual(os.listdir(directory), [SMALL_GIF_DIGEST + '.gif'])
+
+    def test_image_is_released_with_last_reference(self):
+        first = self.upload('first')
+        second = self.upload('second')
+        thumbnails.process(workers=1)
+        path = os.path.join(TEMP_MEDIA_ROOT, SMALL_GIF_NAME)
+        variant = os.path.join(
+            TEMP_MEDIA_ROOT,
+            variants.variant_name(SMALL_GIF_DIGEST, 480, 'jpeg')
+        )
+        first.delete()
+        thumbnails.release(SMALL_GIF_NAME)
+        self.assertTrue(os.path.isfile(path))
+        second.delete()
+        thumbnails.release(SMALL_GIF_NAME)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(variant))
+
+    def test_pregenerate_thumbnails_command(self):
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'old.gif'), 'wb'
+        ) as image:
+            image.write(SMALL_GIF)
+        call_command(
+            'pregenerate_thumbnails', workers=1, stdout=StringIO()
+        )
+        variant = variants.variant_name(SMALL_GIF_DIGEST, 960, 'jpeg')
+        self.assertTrue(os.path.isfile(os.path.join(TEMP_MEDIA_ROOT, variant)))
+
     def test_only_authorized_used_can_comment(self):
         form_data = {
             'text': 'test_text'
@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='group', slug='group', description='group'
+        )
+        cls.post = Post.objects.create(
+            text='foo', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='bar')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_follow_pair_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=FeedIndexesTests.reader,
+                author=FeedIndexesTests.author
+            )
+
+    def test_feeds_use_composite_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', repeat=1, compare=True, stdout=out)
+        current, baseline = out.getvalue().split('Индексы до 0019')
+        for index in (
+            'post_author_created_idx',
+            'post_group_created_idx',
+            'comment_post_created_idx',
+        ):
+            with self.subTest(index=index):
+                self.assertIn(index, current)
+                self.assertNotIn(index, baseline)
+        self.assertNotIn('TEMP B-TREE', current)
+        self.assertIn('TEMP B-TREE', baseline)
+
+
+class SqlitePragmasTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_set_on_connect(self):
+        # 1 — NORMAL; journal_mode у тестовой базы в памяти всегда memory.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
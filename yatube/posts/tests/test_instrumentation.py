@@ -0,0 +1,73 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+
+from core.instrumentation import QueryBudgetExceeded
+from ..models import Post
+from .. import views
+
+User = get_user_model()
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='foo', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_request_is_logged_as_json(self):
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['query_budget'], 5)
+        self.assertEqual(record['cache_misses'], 3)
+        self.assertGreater(record['queries'], 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get('/')
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertContains(
+            response, 'yatube_requests_total{view="posts:index",status="200"}'
+        )
+        self.assertContains(
+            response,
+            'yatube_request_duration_seconds_count{view="posts:index"}'
+        )
+        self.assertContains(response, 'yatube_db_queries_total')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_are_not_public(self):
+        for authorization in ('', 'Bearer wrong', 'Basic secret'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    '/metrics/', REMOTE_ADDR='127.0.0.1',
+                    HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, 403)
+
+    def test_metrics_for_staff(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_login(
+            User.objects.create_user(username='admin', is_staff=True)
+        )
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    def test_exceeded_budget_fails_in_tests(self):
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+                with self.assertRaises(QueryBudgetExceeded):
+                    self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['query_budget'], 0)
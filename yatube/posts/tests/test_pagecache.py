@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from core import pagecache
+from core.testing import run_on_commit
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Group.objects.create(
+            title='cats', slug='cats', description='cats'
+        )
+        cls.dogs = Group.objects.create(
+            title='dogs', slug='dogs', description='dogs'
+        )
+        cls.post = Post.objects.create(
+            text='foo', author=cls.author, group=cls.cats
+        )
+        cls.dog_post = Post.objects.create(
+            text='woof', author=cls.author, group=cls.dogs
+        )
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+        cls.dogs_url = reverse('posts:group_list', kwargs={'slug': 'dogs'})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url, **headers):
+        return self.client.get(url, **headers)
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.get('/')['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/')['X-Page-Cache'], 'hit')
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.force_login(AnonymousPageCacheTests.author)
+        self.get('/')
+        self.assertFalse(self.get('/').has_header('X-Page-Cache'))
+
+    def test_post_save_purges_only_affected_pages(self):
+        for url in ('/', self.detail_url, self.dogs_url):
+            self.get(url)
+        post = AnonymousPageCacheTests.post
+        post.text = 'bar'
+        post.save()
+        self.assertContains(self.get(self.detail_url), 'bar')
+        self.assertContains(self.get('/'), 'bar')
+        self.assertEqual(self.get(self.dogs_url)['X-Page-Cache'], 'hit')
+
+    def test_new_post_and_comment_purge_pages(self):
+        self.get('/')
+        self.get(self.detail_url)
+        with run_on_commit():
+            Post.objects.create(
+                text='fresh', author=AnonymousPageCacheTests.author
+            )
+            Comment.objects.create(
+                post=AnonymousPageCacheTests.post,
+                author=AnonymousPageCacheTests.author,
+                text='nice'
+            )
+        self.assertContains(self.get('/'), 'fresh')
+        self.assertContains(self.get(self.detail_url), 'nice')
+
+    def test_purge_is_repeated_after_commit(self):
+        with run_on_commit():
+            pagecache.purge_on_commit('index')
+            # Страница, закэшированная, пока запись не зафиксирована.
+            self.get('/')
+            self.assertEqual(self.get('/')['X-Page-Cache'], 'hit')
+        self.assertEqual(self.get('/')['X-Page-Cache'], 'miss')
+
+    def test_etag_and_last_modified(self):
+        response = self.get(self.detail_url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        response = self.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
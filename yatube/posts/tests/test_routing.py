@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache.backends.db import DatabaseCache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import ReadYourWritesMiddleware
+from core.routers import PrimaryReplicaRouter
+from core.testing import TEST_REPLICA
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class ReadYourWritesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.router = PrimaryReplicaRouter()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ReadYourWritesTests.user)
+
+    def read_db(self, model=Post, **cookies):
+        seen = []
+
+        def view(request):
+            seen.append(ReadYourWritesTests.router.db_for_read(model))
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        with self.settings(DATABASE_REPLICAS=['replica_1']):
+            ReadYourWritesMiddleware(view)(request)
+        return seen[0]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.read_db(), 'replica_1')
+        self.assertEqual(self.read_db(Session), 'default')
+        with self.settings(DATABASE_REPLICAS=['replica_1']):
+            self.assertEqual(
+                ReadYourWritesTests.router.db_for_write(Post), 'default'
+            )
+
+    def test_database_cache_reads_from_primary(self):
+        cache = DatabaseCache('cache_table', {})
+        self.assertEqual(self.read_db(cache.cache_model_class), 'default')
+
+    def test_pin_cookie_routes_reads_to_primary(self):
+        self.assertEqual(
+            self.read_db(**{settings.DATABASE_PIN_COOKIE: '1'}), 'default'
+        )
+
+    def test_write_views_set_pin_cookie(self):
+        response = self.client.post(reverse('posts:create'), {'text': 'foo'})
+        cookie = response.cookies[settings.DATABASE_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.DATABASE_PIN_SECONDS)
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=[TEST_REPLICA])
+class ReplicaRoutingTests(TestCase):
+    """Реплика — отдельная база, записи до неё не доходят."""
+
+    databases = {'default', TEST_REPLICA}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_follow_writes_go_to_primary(self):
+        reader = ReplicaRoutingTests.reader
+        author = ReplicaRoutingTests.author
+        self.assertEqual(Follow.objects.all().db, TEST_REPLICA)
+        self.assertTrue(Follow.objects.follow(reader, author))
+        self.assertTrue(
+            Follow.objects.using('default').filter(user=reader).exists()
+        )
+        self.assertFalse(
+            Follow.objects.using(TEST_REPLICA).filter(user=reader).exists()
+        )
+        self.assertFalse(Follow.objects.unfollow(reader, author))
+        self.assertFalse(
+            Follow.objects.using('default').filter(user=reader).exists()
+        )
+
+    def test_unsafe_methods_read_from_primary(self):
+        response = Client().post(reverse('users:signup'), {
+            'username': 'author',
+            'password1': 'Zx1-long-password',
+            'password2': 'Zx1-long-password',
+        })
+        self.assertFormError(
+            response, 'form', 'username',
+            'Пользователь с таким именем уже существует.'
+        )
+        self.assertIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+    def test_password_change_sees_user_missing_on_replica(self):
+        client = Client()
+        client.force_login(ReplicaRoutingTests.reader)
+        response = client.post(reverse('users:password_change'), {
+            'old_password': '',
+            'new_password1': 'Zx1-long-password',
+            'new_password2': 'Zx1-long-password',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['user'], ReplicaRoutingTests.reader
+        )
@@ -0,0 +1,169 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Comment, Group, Post
+from .. import search
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов'
+        )
+        cls.cat_post = Post.objects.create(
+            text='Рыжий кот спит на подоконнике',
+            author=cls.author,
+            group=cls.group
+        )
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет, кот смотрит в окно, кот доволен',
+            author=cls.other
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, **filters):
+        return list(search.get_backend().search(query, **filters)[:10])
+
+    def test_results_are_ranked_and_highlighted(self):
+        results = self.found('кот')
+        self.assertEqual(results, [SearchTests.dog_post, SearchTests.cat_post])
+        self.assertIn('<mark>кот</mark>', results[0].snippet)
+
+    def test_prefix_and_filters(self):
+        self.assertEqual(self.found('подокон'), [SearchTests.cat_post])
+        self.assertEqual(
+            self.found('кот', group=SearchTests.group),
+            [SearchTests.cat_post]
+        )
+        self.assertEqual(
+            self.found('кот', author=SearchTests.other),
+            [SearchTests.dog_post]
+        )
+
+    def test_index_follows_signals(self):
+        post = Post.objects.create(text='Попугай', author=SearchTests.author)
+        self.assertEqual(self.found('попугай'), [post])
+        post.text = 'Хомяк'
+        post.save()
+        self.assertEqual(self.found('попугай'), [])
+        Comment.objects.create(
+            post=post, author=SearchTests.other, text='Милый попугай'
+        )
+        self.assertEqual(self.found('попугай'), [post])
+        post.delete()
+        self.assertEqual(self.found('хомяк'), [])
+
+    def test_comments_are_indexed_as_own_rows(self):
+        post = Post.objects.create(text='Хомяк', author=SearchTests.author)
+        comments = [
+            Comment.objects.create(
+                post=post, author=SearchTests.other, text=f'Попугай {number}'
+            )
+            for number in range(3)
+        ]
+        self.assertEqual(self.found('хомяк попугай'), [post])
+        deleted = comments[0].pk
+        with CaptureQueriesContext(connection) as queries:
+            comments[0].delete()
+        self.assertEqual(
+            [
+                query['sql'] for query in queries
+                if 'posts_post_fts' in query['sql']
+            ],
+            [f'DELETE FROM posts_post_fts WHERE rowid IN (-{deleted})']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM posts_post_fts WHERE post_id = %s '
+                'ORDER BY rowid', [post.pk]
+            )
+            self.assertEqual(
+                [rowid for rowid, in cursor.fetchall()],
+                [-comments[2].pk, -comments[1].pk, post.pk]
+            )
+            post.delete()
+            cursor.execute(
+                'SELECT count(*) FROM posts_post_fts WHERE post_id = %s',
+                [post.pk]
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_user_input_is_escaped(self):
+        Post.objects.create(
+            text='<script>alert(1)</script> кот', author=SearchTests.author
+        )
+        self.assertEqual(self.found('" OR * NEAR('), [])
+        response = self.client.get(reverse('posts:search'), {'q': 'alert'})
+        self.assertNotContains(response, '<script>')
+        self.assertContains(response, '<mark>alert</mark>')
+
+    def test_search_page(self):
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кот', 'author': 'author'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), [SearchTests.cat_post]
+        )
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кот', 'author': 'nobody'}
+        )
+        self.assertIsNone(response.context['page_obj'])
+        self.assertContains(response, 'Такого автора нет')
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_post_fts')
+        self.assertEqual(self.found('кот'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found('кот')), 2)
+
+    @override_settings(POST_SEARCH_BACKEND='posts.search.DatabaseBackend')
+    def test_database_backend(self):
+        results = self.found('подоконнике')
+        self.assertEqual(results, [SearchTests.cat_post])
+        self.assertIn('<mark>подоконнике</mark>', results[0].snippet)
+
+
+@override_settings(POST_SEARCH_BACKEND=None)
+class BackendChoiceTests(TestCase):
+    def test_backend_follows_database_vendor(self):
+        self.assertIsInstance(search.get_backend(), search.SqliteFtsBackend)
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertIsInstance(
+                search.get_backend(), search.DatabaseBackend
+            )
+
+    def test_signals_work_without_fts_table(self):
+        """Как на PostgreSQL: миграция не создала posts_post_fts."""
+        author = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(author)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE posts_post_fts')
+        with mock.patch.object(search, 'VENDOR_BACKENDS', {}):
+            client.post(reverse('posts:create'), {'text': 'Зелёный попугай'})
+            post = Post.objects.get()
+            client.post(
+                reverse('posts:add_comment', args=(post.pk,)),
+                {'text': 'Милый попугай'}
+            )
+            post.comments.get().delete()
+            self.assertEqual(
+                list(search.get_backend().search('попугай')[:10]), [post]
+            )
+            post.delete()
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,93 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from core.staticfiles import purge_css, used_classes
+from core.views import serve_static
+
+STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class PurgeCssTests(SimpleTestCase):
+    def test_unused_rules_are_removed(self):
+        css = (
+            '@charset "UTF-8";/*! license */:root{--x:1}'
+            '.used{a:1}.unused{b:2}.used,.unused .used{c:3}'
+            '@media (min-width:1px){.unused{d:4}.used>p{e:5}}'
+            '@media print{.unused{f:6}}'
+            '.used:not(.missing){g:7}/* map */'
+        )
+        self.assertEqual(
+            purge_css(css, {'used'}),
+            '@charset "UTF-8";/*! license */:root{--x:1}'
+            '.used{a:1}.used{c:3}'
+            '@media (min-width:1px){.used>p{e:5}}'
+            '.used:not(.missing){g:7}'
+        )
+
+    def test_classes_are_collected_from_templates(self):
+        classes = used_classes()
+        for name in ('navbar', 'page-link', 'active', 'form-control'):
+            with self.subTest(name=name):
+                self.assertIn(name, classes)
+        self.assertNotIn('if', classes)
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE='core.staticfiles.'
+                        'CompressedManifestStaticFilesStorage'
+)
+class StaticBuildTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(STATIC_ROOT, 'staticfiles.json')) as file:
+            cls.css = json.load(file)['paths']['css/bootstrap.min.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(STATIC_ROOT, name)
+
+    def test_css_is_hashed_purged_and_compressed(self):
+        source = os.path.join(
+            settings.BASE_DIR, 'static', 'css', 'bootstrap.min.css'
+        )
+        self.assertLess(
+            os.path.getsize(self.path(self.css)), os.path.getsize(source) / 2
+        )
+        with gzip.open(self.path(self.css + '.gz')) as compressed:
+            with open(self.path(self.css), 'rb') as original:
+                self.assertEqual(compressed.read(), original.read())
+
+    def test_hashed_files_are_served_compressed_and_immutable(self):
+        request = RequestFactory().get(
+            '/static/' + self.css, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        response = serve_static(request, self.css, STATIC_ROOT)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn(
+            self.css, staticfiles_storage.url('css/bootstrap.min.css')
+        )
+
+    def test_unhashed_files_are_not_immutable(self):
+        request = RequestFactory().get('/static/css/bootstrap.min.css')
+        response = serve_static(
+            request, 'css/bootstrap.min.css', STATIC_ROOT
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Cache-Control'))
@@ -0,0 +1,178 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.paginator import CursorPaginator
+from core.testing import run_on_commit
+from ..models import Post, Follow, TimelineEntry
+from .. import timeline
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(TimelineTests.reader)
+
+    def follow(self):
+        self.client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': TimelineTests.author.username}
+        ))
+
+    def test_follow_backfills_existing_posts(self):
+        self.follow()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTests.reader,
+            post=TimelineTests.old_post
+        ).exists())
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.follow()
+        post = Post.objects.create(text='new', author=TimelineTests.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_unfollow_trims_timeline(self):
+        self.follow()
+        self.client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': TimelineTests.author.username}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.reader).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        Follow.objects.create(
+            user=TimelineTests.reader,
+            author=TimelineTests.author
+        )
+        cache.clear()
+        post = Post.objects.create(text='new', author=TimelineTests.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, timeline.follow_feed(TimelineTests.reader))
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=1)
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.follow(cls.reader, cls.author)
+        Follow.objects.follow(cls.reader, cls.star)
+        Follow.objects.follow(cls.fan, cls.star)
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, author, text):
+        return Post.objects.create(text=text, author=author)
+
+    def test_entries_and_celebrity_posts_are_merged(self):
+        reader = FollowFeedTests.reader
+        posts = [
+            self.post(FollowFeedTests.author, 'a1'),
+            self.post(FollowFeedTests.star, 's1'),
+            self.post(FollowFeedTests.author, 'a2'),
+            self.post(FollowFeedTests.star, 's2'),
+            self.post(FollowFeedTests.author, 'a3'),
+        ]
+        self.assertFalse(TimelineEntry.objects.filter(
+            author=FollowFeedTests.star
+        ).exists())
+        paginator = CursorPaginator(timeline.follow_feed(reader), 2)
+        page = paginator.cursor_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.cursor_page(page.next_cursor)
+            seen += list(page)
+        self.assertEqual(seen, posts[::-1])
+        rows = timeline.follow_feed(reader).values('id', 'created')[:2]
+        self.assertEqual([row['id'] for row in rows], [
+            posts[4].pk, posts[3].pk
+        ])
+
+    def test_timeline_is_read_by_index_range(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(timeline.follow_feed(FollowFeedTests.reader).for_feed()[:10])
+        sql = next(
+            query['sql'] for query in queries
+            if 'FROM "posts_timelineentry"' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('timeline_user_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_posts_stay_when_author_drops_below_limit(self):
+        post = self.post(FollowFeedTests.star, 'while famous')
+        with run_on_commit():
+            Follow.objects.unfollow(FollowFeedTests.fan, FollowFeedTests.star)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=FollowFeedTests.reader, post=post
+        ).exists())
+        self.assertNotIn(FollowFeedTests.star.pk, timeline.celebrity_ids())
+        self.assertIn(post, timeline.follow_feed(FollowFeedTests.reader))
+
+
+class FollowQuerySetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='old', author=cls.author)
+
+    def test_follow_is_idempotent_single_query(self):
+        reader = FollowQuerySetTests.reader
+        author = FollowQuerySetTests.author
+        self.assertTrue(Follow.objects.follow(reader, author))
+        with self.assertNumQueries(1):
+            self.assertTrue(Follow.objects.follow(reader, author))
+        self.assertEqual(Follow.objects.count(), 1)
+        author.stats.refresh_from_db()
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=reader).exists())
+
+    def test_unfollow_is_idempotent_single_query(self):
+        reader = FollowQuerySetTests.reader
+        author = FollowQuerySetTests.author
+        Follow.objects.follow(reader, author)
+        self.assertFalse(Follow.objects.unfollow(reader, author))
+        with self.assertNumQueries(1):
+            self.assertFalse(Follow.objects.unfollow(reader, author))
+        author.stats.refresh_from_db()
+        self.assertEqual(author.stats.followers_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(user=reader).exists())
+
+    def test_self_follow_is_ignored(self):
+        reader = FollowQuerySetTests.reader
+        with self.assertNumQueries(0):
+            self.assertFalse(Follow.objects.follow(reader, reader))
+
+    def test_double_unfollow_request(self):
+        client = Client()
+        client.force_login(FollowQuerySetTests.reader)
+        url = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': FollowQuerySetTests.author.username}
+        )
+        self.assertEqual(client.get(url).status_code, 302)
+        self.assertEqual(client.get(url).status_code, 302)
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+from .test_forms import SMALL_GIF, SMALL_GIF_NAME
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE=False)
+class TransferTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Коты', slug='cats')
+        post = Post.objects.create(text='Первый', author=author, group=group)
+        Post.objects.create(text='Второй', author=reader)
+        Comment.objects.create(post=post, author=reader, text='Ответ')
+        Follow.objects.create(user=reader, author=author)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def call(self, *args, **options):
+        call_command(*args, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'created', 'author__username', 'group__slug'
+            )),
+            list(Comment.objects.values_list('post_id', 'text', 'created')),
+            list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_round_trip_to_empty_database(self):
+        for format in ('.jsonl', '.csv'):
+            with self.subTest(format=format):
+                before = self.snapshot()
+                for kind in ('posts', 'comments', 'follows'):
+                    self.call('export_data', kind, self.path(kind + format))
+                User.objects.all().delete()
+                Group.objects.all().delete()
+                for kind in ('posts', 'comments', 'follows'):
+                    self.call('import_data', kind, self.path(kind + format))
+                self.assertEqual(self.snapshot(), before)
+                author = User.objects.get(username='author')
+                self.assertFalse(author.has_usable_password())
+                self.assertEqual(author.stats.followers_count, 1)
+                self.assertEqual(
+                    Post.objects.get(text='Первый').comments_count, 1
+                )
+                self.assertEqual(
+                    AuthorStats.objects.get(user=author).posts_count, 1
+                )
+
+    def test_repeated_import_does_not_duplicate(self):
+        self.call('export_data', 'posts', self.path('posts.jsonl'))
+        self.call('import_data', 'posts', self.path('posts.jsonl'))
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_resume_skips_loaded_rows(self):
+        with open(self.path('posts.jsonl'), 'w') as file:
+            for number in range(3):
+                file.write(json.dumps(
+                    {'author': 'author', 'text': f'Новый {number}'}
+                ) + '\n')
+        with open(self.path('posts.jsonl.progress'), 'w') as progress:
+            progress.write('2')
+        self.call(
+            'import_data', 'posts', self.path('posts.jsonl'), resume=True
+        )
+        self.assertEqual(
+            list(Post.objects.filter(text__startswith='Новый')
+                 .values_list('text', flat=True)),
+            ['Новый 2']
+        )
+        self.assertFalse(os.path.exists(self.path('posts.jsonl.progress')))
+
+    def test_comment_to_unknown_post_is_rejected(self):
+        with open(self.path('comments.jsonl'), 'w') as file:
+            file.write(json.dumps(
+                {'post': 10 ** 6, 'author': 'reader', 'text': 'Ответ'}
+            ) + '\n')
+        with self.assertRaises(CommandError):
+            self.call('import_data', 'comments', self.path('comments.jsonl'))
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_image_from_local_path(self):
+        with open(self.path('photo.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+        with open(self.path('posts.jsonl'), 'w') as file:
+            for image in ('photo.gif', 'file://' + self.path('photo.gif')):
+                file.write(json.dumps({
+                    'author': 'author', 'text': 'С картинкой', 'image': image
+                }) + '\n')
+        self.call('import_data', 'posts', self.path('posts.jsonl'))
+        self.assertEqual(
+            set(Post.objects.filter(text='С картинкой')
+                .values_list('image', flat=True)),
+            {SMALL_GIF_NAME}
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, SMALL_GIF_NAME))
+        )
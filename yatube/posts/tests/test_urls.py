@@ -1,5 +1,6 @@
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase, Client
 from ..models import Post, Group
 
@@ -40,6 +41,9 @@ class StaticURLTests(TestCase):
         cls.post_url = f'/posts/{StaticURLTests.post_id}/'
         cls.post_edit_url = f'/posts/{StaticURLTests.post_id}/edit/'
 
+    def setUp(self):
+        cache.clear()
+
     def test_public_pages(self):
         for address, _ in StaticURLTests.public_urls:
             with self.subTest(address=address):
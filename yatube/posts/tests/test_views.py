@@ -6,6 +6,9 @@ from ..models import Post, Group, Comment, Follow
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from core.paginator import MAX_OFFSET_PAGE, CursorPaginator
+from core.testing import run_on_commit
 
 User = get_user_model()
 
@@ -250,6 +253,35 @@ class PostsPagesTests(TestCase):
                 )
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_pages_walk_forward_and_back(self):
+        for address, _, args in PostsPagesTests.paginator_url:
+            with self.subTest(address=address):
+                url = reverse(address, kwargs=args)
+                first_page = PostsPagesTests.authorized_client.get(
+                    url
+                ).context['page_obj']
+                second_page = PostsPagesTests.authorized_client.get(
+                    url, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(second_page.number, 2)
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(
+                    set(first_page).isdisjoint(set(second_page))
+                )
+                back_page = PostsPagesTests.authorized_client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(back_page.number, 1)
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_broken_cursor_returns_first_page(self):
+        response = PostsPagesTests.authorized_client.get(
+            reverse(PostsPagesTests.index_url[0]), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
     def test_are_post_with_group_exists_in_appropriate_pages(self):
         for address, _, args in PostsPagesTests.paginator_url:
             with self.subTest(address=address):
@@ -317,36 +349,47 @@ class PostsPagesTests(TestCase):
             new_comment = None
         self.assertIsNotNone(new_comment)
 
-    def test_index_post_is_in_cache_after_deleting(self):
-        response_1 = PostsPagesTests.authorized_client.get(
+    def test_post_card_is_served_from_cache(self):
+        cache.clear()
+        PostsPagesTests.authorized_client.get(
             reverse(PostsPagesTests.index_url[0])
         )
-        content_before_post_deletion = response_1.content
-        post_to_delete = Post.objects.get(pk=1)
-        post_to_delete.delete()
-        response_2 = PostsPagesTests.authorized_client.get(
-            reverse(PostsPagesTests.index_url[0])
+        Post.objects.filter(pk=PostsPagesTests.post_id).update(
+            text='not_from_signal'
         )
-        content_after_post_deletion = response_2.content
-        self.assertEqual(
-            content_before_post_deletion,
-            content_after_post_deletion)
-
-    def test_index_post_is_not_in_content_if_cache_cleared(self):
-        response_1 = PostsPagesTests.authorized_client.get(
+        response = PostsPagesTests.authorized_client.get(
             reverse(PostsPagesTests.index_url[0])
         )
-        content_before_post_deletion = response_1.content
-        post_to_delete = Post.objects.get(pk=1)
-        post_to_delete.delete()
+        self.assertNotContains(response, 'not_from_signal')
         cache.clear()
-        response_2 = PostsPagesTests.authorized_client.get(
+        response = PostsPagesTests.authorized_client.get(
             reverse(PostsPagesTests.index_url[0])
         )
-        content_after_post_deletion = response_2.content
-        self.assertNotEqual(
-            content_before_post_deletion,
-            content_after_post_deletion)
+        self.assertContains(response, 'not_from_signal')
+
+    def test_edited_post_card_is_invalidated(self):
+        for address, _, args in PostsPagesTests.pages_urls[:4]:
+            with self.subTest(address=address):
+                url = reverse(address, kwargs=args)
+                PostsPagesTests.authorized_client.get(url)
+                post = Post.objects.get(pk=PostsPagesTests.post_id)
+                post.text = f'edited_{address}'
+                with run_on_commit():
+                    post.save()
+                response = PostsPagesTests.authorized_client.get(url)
+                self.assertContains(response, f'edited_{address}')
+
+    def test_deleted_post_disappears_from_index(self):
+        url = reverse(PostsPagesTests.index_url[0])
+        response = PostsPagesTests.authorized_client.get(url)
+        self.assertContains(
+            response, f'/posts/{PostsPagesTests.post_id}/"'
+        )
+        Post.objects.get(pk=PostsPagesTests.post_id).delete()
+        response = PostsPagesTests.authorized_client.get(url)
+        self.assertNotContains(
+            response, f'/posts/{PostsPagesTests.post_id}/"'
+        )
 
     def test_authorized_user_can_follow(self):
         author_username = PostsPagesTests.profile_follow_url[2]['username']
@@ -401,7 +444,7 @@ class PostsPagesTests(TestCase):
         ).content
         self.assertNotEqual(response, response_2)
 
-    def test_new_posts_from_following_are_exists(self):
+    def test_new_post_appears_on_index(self):
         author_username = PostsPagesTests.profile_follow_url[2]['username']
         author = User.objects.get(username=author_username)
         response = PostsPagesTests.authorized_client_2.get(
@@ -414,4 +457,168 @@ class PostsPagesTests(TestCase):
         response_2 = PostsPagesTests.authorized_client_2.get(
             reverse(PostsPagesTests.index_url[0])
         ).content
-        self.assertEqual(response, response_2)
+        self.assertNotEqual(response, response_2)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='smt',
+            slug='test_slug',
+            description='random-group'
+        )
+        for _ in range(12):
+            cls.post = Post.objects.create(
+                text='foo',
+                author=cls.author,
+                group=cls.group
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        cls.budgets = (
+            (reverse('posts:index'), 5),
+            (reverse('posts:group_list', kwargs={'slug': 'test_slug'}), 5),
+            (reverse('posts:profile', kwargs={'username': 'author'}), 5),
+            (reverse('posts:follow_index'), 4),
+            (reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.id}
+            ), 5),
+        )
+
+    def test_feeds_fit_query_budget(self):
+        for url, budget in FeedQueriesTests.budgets:
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    FeedQueriesTests.authorized_client.get(url)
+
+
+class PageWindowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        for number in range(25):
+            Post.objects.create(text=f'post {number}', author=cls.author)
+
+    def paginator(self, total=25):
+        return CursorPaginator(Post.objects.all(), 2, total=total)
+
+    def test_window_is_elided_around_current_page(self):
+        self.assertEqual(
+            self.paginator().get_page().window, [1, 2, None, 13]
+        )
+        self.assertEqual(
+            self.paginator().get_page(4).window,
+            [1, None, 3, 4, 5, None, 13]
+        )
+
+    def test_window_without_total_ends_at_next_page(self):
+        self.assertEqual(
+            self.paginator(total=None).get_page(5).window,
+            [1, None, 4, 5, 6]
+        )
+
+    def test_deep_offset_pages_are_capped(self):
+        with self.assertRaises(InvalidPage):
+            self.paginator().get_page(MAX_OFFSET_PAGE + 1)
+        page = self.paginator().get_page(MAX_OFFSET_PAGE)
+        self.assertEqual(page.number, MAX_OFFSET_PAGE)
+
+    def test_deep_offset_page_is_not_found(self):
+        cache.clear()
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.client.get(url, {'page': MAX_OFFSET_PAGE + 1})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_window_links_never_use_offset(self):
+        cache.clear()
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.client.get(url)
+        while response.context['page_obj'].has_next():
+            self.assertNotRegex(
+                response.content.decode(), r'\?page=(?!last")'
+            )
+            response = self.client.get(
+                url, {'cursor': response.context['page_obj'].next_cursor}
+            )
+        self.assertEqual(response.context['page_obj'].number, 3)
+
+    def test_last_page_is_read_from_the_end(self):
+        page = self.paginator().get_page('last')
+        self.assertEqual(page.number, 13)
+        self.assertFalse(page.has_next())
+        self.assertEqual(
+            [post.text for post in page], ['post 1', 'post 0']
+        )
+        previous = self.paginator().get_page(cursor=page.previous_cursor)
+        self.assertEqual(previous.number, 12)
+        self.assertEqual(
+            [post.text for post in previous], ['post 3', 'post 2']
+        )
+
+    def test_profile_shows_total_and_no_page_per_link(self):
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            {'page': 2}
+        )
+        self.assertContains(response, 'Постов: 25')
+        self.assertContains(response, 'class="page-item', count=5)
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(text='foo', author=cls.user)
+        for number in range(25):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.user,
+                text=f'comment_{number}'
+            )
+        cls.guest_client = Client()
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+        cls.comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_of_comments(self):
+        response = CommentsPaginationTests.guest_client.get(
+            CommentsPaginationTests.detail_url
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'comment_0')
+        self.assertTrue(comments.has_next())
+
+    def test_load_more_endpoint(self):
+        comments = CommentsPaginationTests.guest_client.get(
+            CommentsPaginationTests.detail_url
+        ).context['comments']
+        with self.assertNumQueries(2):
+            response = CommentsPaginationTests.guest_client.get(
+                CommentsPaginationTests.comments_url,
+                {'cursor': comments.next_cursor}
+            )
+        data = response.json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            [f'comment_{number}' for number in range(20, 25)]
+        )
+        self.assertEqual(data['comments'][0]['author'], 'test_user')
+        self.assertIsNone(data['next'])
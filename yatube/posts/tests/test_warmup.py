@@ -0,0 +1,39 @@
+import importlib
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from core.warmup import warm_templates
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def production_settings(self):
+        with mock.patch.dict(os.environ, {'SECRET_KEY': 'secret'}):
+            return importlib.reload(
+                importlib.import_module('yatube.settings_production')
+            )
+
+    def test_production_profile_uses_cached_loader(self):
+        production = self.production_settings()
+        self.assertFalse(production.DEBUG)
+        self.assertTrue(production.TEMPLATE_WARMUP)
+        loader, _ = production.TEMPLATES[0]['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        self.assertTrue(settings.TEMPLATES[0]['APP_DIRS'])
+
+    def test_warmup_fills_template_cache(self):
+        with override_settings(
+            TEMPLATES=self.production_settings().TEMPLATES
+        ):
+            self.assertGreater(warm_templates(), 0)
+            backend = engines.all()[0]
+            cached_loader = backend.engine.template_loaders[0]
+            self.assertIn(
+                'posts/includes/paginator.html',
+                cached_loader.get_template_cache
+            )
+            with mock.patch('builtins.open') as opened:
+                backend.get_template('posts/index.html')
+            opened.assert_not_called()
@@ -0,0 +1,150 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core import pagecache
+
+from . import cards, pages, variants
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+
+def generate(name):
+    """Построить варианты картинки и показать их в карточках постов."""
+    digest = variants.generate(name)
+    posts = Post.objects.filter(image=name).exclude(image_digest=digest)
+    post_ids = list(posts.values_list('pk', flat=True))
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(image_digest=digest)
+        cards.invalidate_cards(post_ids)
+        # Страницы с заглушкой вместо картинки тоже устарели.
+        pagecache.purge(*map(pages.post_key, post_ids))
+
+
+def generate_safely(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', name)
+        return False
+    return True
+
+
+def _generate_in_thread(name):
+    try:
+        return generate_safely(name)
+    finally:
+        connections.close_all()
+
+
+def image_names(directory='posts'):
+    if not default_storage.exists(directory):
+        return
+    dirs, files = default_storage.listdir(directory)
+    for file_name in files:
+        yield f'{directory}/{file_name}'
+    for sub_dir in dirs:
+        yield from image_names(f'{directory}/{sub_dir}')
+
+
+def release(name):
+    """Удалить картинку, миниатюры и варианты, если она больше не нужна.
+
+    Одинаковые загрузки хранятся одним файлом, поэтому файл удаляется
+    только когда на него не ссылается ни один пост.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    try:
+        if not default_storage.exists(name):
+            return
+    except SuspiciousFileOperation:
+        return
+    variants.delete(variants.file_digest(name))
+    delete_thumbnails(name)
+
+
+def schedule(*names, process_now=None):
+    """Поставить картинки в очередь.
+
+    С запущенным process_thumbnails (THUMBNAIL_WORKER) запрос не ждёт
+    обработки; без него варианты строятся здесь же после фиксации
+    транзакции, иначе картинки так и остались бы в очереди.
+    """
+    jobs = []
+    for name in names:
+        try:
+            if name and default_storage.exists(name):
+                jobs.append(ThumbnailJob(image=name))
+        except SuspiciousFileOperation:
+            continue
+    ThumbnailJob.objects.bulk_create(jobs, ignore_conflicts=True)
+    if process_now is None:
+        process_now = not settings.THUMBNAIL_WORKER
+    if jobs and process_now:
+        transaction.on_commit(partial(
+            process, batch_size=len(jobs), workers=1,
+            names=[job.image for job in jobs]
+        ))
+
+
+def claim(batch_size, names=None):
+    """Взять пачку свободных заданий и вернуть пары (id, картинка).
+
+    UPDATE повторяет условие отбора, поэтому задание, которое между
+    выборкой и записью забрал другой обработчик, сюда не попадёт.
+    """
+    now = timezone.now()
+    available = ThumbnailJob.objects.filter(
+        Q(claimed_at__isnull=True)
+        | Q(claimed_at__lt=now - timedelta(
+            seconds=settings.THUMBNAIL_CLAIM_TIMEOUT
+        )),
+        attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS
+    )
+    if names is not None:
+        available = available.filter(image__in=names)
+    job_ids = list(available.values_list('pk', flat=True)[:batch_size])
+    if not job_ids:
+        return []
+    token = uuid.uuid4().hex
+    available.filter(pk__in=job_ids).update(claim=token, claimed_at=now)
+    return list(
+        ThumbnailJob.objects.filter(claim=token).values_list('pk', 'image')
+    )
+
+
+def process(batch_size=100, workers=None, names=None):
+    """Обработать очередную пачку заданий и вернуть их количество.
+
+    Удаляются только выполненные задания; у неудачных растёт attempts,
+    и они повторяются через THUMBNAIL_CLAIM_TIMEOUT, пока попыток меньше
+    THUMBNAIL_MAX_ATTEMPTS.
+    """
+    workers = workers or settings.THUMBNAIL_WORKERS
+    jobs = claim(batch_size, names)
+    if not jobs:
+        return 0
+    names = [name for _, name in jobs]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_generate_in_thread, names))
+    else:
+        results = [generate_safely(name) for name in names]
+    done = {pk for (pk, _), ok in zip(jobs, results) if ok}
+    ThumbnailJob.objects.filter(pk__in=done).delete()
+    ThumbnailJob.objects.filter(
+        pk__in=[pk for pk, _ in jobs if pk not in done]
+    ).update(attempts=F('attempts') + 1)
+    return len(jobs)
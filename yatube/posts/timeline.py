@@ -0,0 +1,268 @@
+import copy
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core import cache
+
+from .models import FEED_FIELDS, AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+# Поля поста, которые есть в самой записи ленты; остальные — через post.
+ENTRY_FIELDS = {
+    'id': 'post_id',
+    'pk': 'post_id',
+    'created': 'created',
+    'author': 'author',
+    'author_id': 'author_id',
+}
+
+
+def celebrities_key():
+    return cache.key('timeline', 'celebrities')
+
+
+def celebrity_ids():
+    """Авторы, чьи посты не раскладываются по лентам при записи."""
+    return cache.get_or_compute(
+        celebrities_key(),
+        lambda: set(AuthorStats.objects.filter(
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)),
+        settings.TIMELINE_CELEBRITIES_TIMEOUT
+    )
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    if post.author_id in celebrity_ids():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created=post.created
+        )
+        for user_id in followers.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def backfill(user_id, author_id):
+    if author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'created'
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            created=created
+        )
+        for post_id, created in posts.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def trim(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def followers_changed(author_id, delta):
+    """Проследить, не пересёк ли автор TIMELINE_FANOUT_LIMIT.
+
+    Посты, написанные знаменитостью, есть только в её профиле: ленты
+    читают их при показе. Когда подписчиков становится не больше
+    порога, их раскладывают по лентам всех подписчиков, иначе они
+    пропали бы из лент вместе с чтением при показе.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    followers = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if followers != (limit + 1 if delta > 0 else limit):
+        return
+    if delta < 0:
+        with connection.cursor() as cursor:
+            # WHERE обязателен: без него SQLite не разберёт ON CONFLICT.
+            cursor.execute(
+                f'INSERT INTO {TimelineEntry._meta.db_table} '
+                f'(user_id, post_id, author_id, created) '
+                f'SELECT f.user_id, p.id, p.author_id, p.created '
+                f'FROM {Follow._meta.db_table} f '
+                f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+                f'WHERE f.author_id = %s '
+                f'ON CONFLICT (user_id, post_id) DO NOTHING',
+                [author_id]
+            )
+    transaction.on_commit(lambda: cache.delete(celebrities_key()))
+
+
+@transaction.atomic
+def rebuild():
+    """Пересобрать все ленты одним INSERT ... SELECT и вернуть число строк.
+
+    Нужна после массовой загрузки в обход сигналов; счётчики подписчиков
+    должны быть уже пересчитаны, чтобы пропустить знаменитостей.
+    """
+    TimelineEntry.objects.all().delete()
+    cache.delete(celebrities_key())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, author_id, created) '
+            f'SELECT f.user_id, p.id, p.author_id, p.created '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'WHERE f.author_id NOT IN ('
+            f'SELECT user_id FROM {AuthorStats._meta.db_table} '
+            f'WHERE followers_count > %s)',
+            [settings.TIMELINE_FANOUT_LIMIT]
+        )
+        return cursor.rowcount
+
+
+def _entry_name(name):
+    """Поле или лукап Post в терминах TimelineEntry."""
+    prefix = '-' if name.startswith('-') else ''
+    field, _, rest = name.lstrip('-').partition('__')
+    entry_field = ENTRY_FIELDS.get(field, f'post__{field}')
+    return prefix + entry_field + (f'__{rest}' if rest else '')
+
+
+def _entry_condition(condition):
+    children = [
+        _entry_condition(child) if isinstance(child, Q)
+        else (_entry_name(child[0]), child[1])
+        for child in condition.children
+    ]
+    return Q._new_instance(children, condition.connector, condition.negated)
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+class FollowFeed:
+    """Лента подписок для CursorPaginator.
+
+    Основа — диапазон по индексу TimelineEntry(user, -created, -post)
+    с постами через JOIN. Посты знаменитостей, которые не раскладываются
+    при записи, читаются отдельным запросом по (author, -created) и
+    сливаются с записями по ключу сортировки. Понимает то, что нужно
+    пагинатору и вью: order_by, filter по полям ключа, for_feed, values
+    и срезы.
+    """
+
+    model = Post
+    ordered = True
+
+    def __init__(self, user):
+        self.user = user
+        self.ordering = ('-created', '-id')
+        self.conditions = ()
+        self.fields = None
+        self.columns = None
+
+    def _clone(self, **changes):
+        clone = copy.copy(self)
+        clone.__dict__.update(changes)
+        return clone
+
+    def order_by(self, *ordering):
+        return self._clone(ordering=ordering)
+
+    def filter(self, *args, **kwargs):
+        return self._clone(
+            conditions=(*self.conditions, Q(*args, **kwargs))
+        )
+
+    def for_feed(self):
+        return self._clone(fields=FEED_FIELDS)
+
+    def values(self, *columns):
+        return self._clone(columns=columns)
+
+    @cached_property
+    def followed_celebrities(self):
+        celebrities = celebrity_ids()
+        if not celebrities:
+            return []
+        return list(Follow.objects.filter(
+            user=self.user,
+            author_id__in=celebrities
+        ).values_list('author_id', flat=True))
+
+    def _entries(self, limit):
+        entries = TimelineEntry.objects.filter(
+            *map(_entry_condition, self.conditions), user=self.user
+        ).order_by(*map(_entry_name, self.ordering))
+        if self.columns is not None:
+            names = {column: _entry_name(column) for column in self.columns}
+            return [
+                {column: row[name] for column, name in names.items()}
+                for row in entries.values(*names.values())[:limit]
+            ]
+        if self.fields is not None:
+            entries = entries.select_related(
+                'post__author', 'post__group'
+            ).only('post', *(f'post__{field}' for field in self.fields))
+        else:
+            entries = entries.select_related('post')
+        return [entry.post for entry in entries[:limit]]
+
+    def _celebrity_posts(self, limit):
+        if not self.followed_celebrities:
+            return []
+        posts = Post.objects.filter(
+            *self.conditions, author_id__in=self.followed_celebrities
+        ).order_by(*self.ordering)
+        if self.columns is not None:
+            posts = posts.values(*self.columns)
+        elif self.fields is not None:
+            posts = posts.for_feed()
+        return list(posts[:limit])
+
+    def _rows(self, limit):
+        rows = self._entries(limit) + self._celebrity_posts(limit)
+        names = [name.lstrip('-') for name in self.ordering]
+        rows.sort(
+            key=lambda row: [_value(row, name) for name in names],
+            reverse=self.ordering[0].startswith('-')
+        )
+        seen, merged = set(), []
+        # Пост знаменитости мог попасть в ленты, пока она ею не была.
+        for row in rows:
+            if _value(row, 'id') not in seen:
+                seen.add(_value(row, 'id'))
+                merged.append(row)
+        return merged[:limit]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return self._rows(key.stop)[key]
+
+    def __iter__(self):
+        return iter(self._rows(None))
+
+
+def follow_feed(user):
+    """Лента подписок: готовые записи плюс чтение постов знаменитостей."""
+    return FollowFeed(user)
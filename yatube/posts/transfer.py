@@ -0,0 +1,281 @@
+"""Потоковый импорт и экспорт постов, комментариев и подписок.
+
+Файлы — JSONL или CSV, одна запись на строку. Пользователи и группы
+записываются по username и slug и создаются при импорте, если их нет,
+а посты, комментарии и подписки сохраняют свои id, поэтому повторный
+импорт того же файла ничего не дублирует. bulk_create обходит сигналы:
+счётчики, ленты и поиск пересчитывает rebuild_derived.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import counting, pagecache
+
+from . import counters, pages, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+# Колонка файла -> поле для values_list() при экспорте.
+COLUMNS = {
+    'posts': {
+        'id': 'id',
+        'created': 'created',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'image': 'image',
+    },
+    'comments': {
+        'id': 'id',
+        'post': 'post_id',
+        'created': 'created',
+        'author': 'author__username',
+        'text': 'text',
+    },
+    'follows': {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+MODELS = {'posts': Post, 'comments': Comment, 'follows': Follow}
+
+
+@contextmanager
+def manual_created(*models):
+    """Дать bulk_create записать свои даты вместо auto_now_add."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def detect_format(path, format=None):
+    if format:
+        return format
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_rows(file, format):
+    if format == 'csv':
+        return csv.DictReader(file)
+    return (json.loads(line) for line in file if line.strip())
+
+
+def export_rows(kind, after_id=0, chunk_size=2000):
+    """Записи по возрастанию id, с after_id можно продолжить выгрузку."""
+    columns = COLUMNS[kind]
+    values = (
+        MODELS[kind].objects
+        .filter(pk__gt=after_id)
+        .order_by('pk')
+        .values_list(*columns.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    for record in values:
+        row = dict(zip(columns, record))
+        if row.get('created'):
+            row['created'] = row['created'].isoformat()
+        yield row
+
+
+def write_rows(file, format, kind, rows, header=True):
+    """Записать строки и отдавать число записанных для прогресса."""
+    if format == 'csv':
+        writer = csv.DictWriter(file, fieldnames=list(COLUMNS[kind]))
+        if header:
+            writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            file.write(json.dumps(row, ensure_ascii=False) + '\n')
+    for done, row in enumerate(rows, 1):
+        write(row)
+        yield done
+
+
+def _ids(model, field, values, make):
+    """Словарь значение -> id, недостающие записи создаются пачкой."""
+    values = {value for value in values if value}
+    known = dict(
+        model.objects.filter(**{f'{field}__in': values})
+        .values_list(field, 'pk')
+    )
+    missing = values - known.keys()
+    if missing:
+        model.objects.bulk_create(
+            [make(value) for value in missing], ignore_conflicts=True
+        )
+        known.update(
+            model.objects.filter(**{f'{field}__in': missing})
+            .values_list(field, 'pk')
+        )
+    return known
+
+
+def _users(*usernames):
+    password = make_password(None)
+    return _ids(User, 'username', usernames, lambda username: User(
+        username=username, password=password
+    ))
+
+
+def _created(row):
+    if not row.get('created'):
+        return timezone.now()
+    created = parse_datetime(row['created'])
+    if created is None:
+        raise ValueError(f'Неверная дата: {row["created"]}')
+    return created
+
+
+def store_image(value, images_dir=None):
+    """Имя картинки в хранилище по пути, file:// URL или имени в media.
+
+    Файлы с диска проходят через хранилище поста и дедуплицируются по
+    содержимому, как загрузки через форму.
+    """
+    if not value:
+        return ''
+    field = Post._meta.get_field('image')
+    parsed = urlparse(value)
+    if parsed.scheme == 'file':
+        path = unquote(parsed.path)
+    elif len(parsed.scheme) > 1:
+        raise ValueError(f'Картинки загружаются только с диска: {value}')
+    elif os.path.isabs(value):
+        path = value
+    elif field.storage.exists(value):
+        return value
+    else:
+        path = os.path.join(images_dir or '', value)
+    with open(path, 'rb') as image:
+        return field.storage.save(
+            field.generate_filename(None, os.path.basename(path)),
+            File(image)
+        )
+
+
+def _build_posts(rows, images_dir):
+    users = _users(*(row['author'] for row in rows))
+    groups = _ids(
+        Group, 'slug', (row.get('group') for row in rows),
+        lambda slug: Group(slug=slug, title=slug, description='')
+    )
+    return [
+        Post(
+            id=row.get('id') or None,
+            text=row['text'],
+            author_id=users[row['author']],
+            group_id=groups.get(row.get('group')),
+            image=store_image(row.get('image'), images_dir),
+            created=_created(row)
+        )
+        for row in rows
+    ]
+
+
+def _build_comments(rows, images_dir):
+    users = _users(*(row['author'] for row in rows))
+    post_ids = {int(row['post']) for row in rows}
+    missing = post_ids - set(
+        Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True)
+    )
+    if missing:
+        raise ValueError(f'Нет постов с id {sorted(missing)}')
+    return [
+        Comment(
+            id=row.get('id') or None,
+            post_id=int(row['post']),
+            author_id=users[row['author']],
+            text=row['text'],
+            created=_created(row)
+        )
+        for row in rows
+    ]
+
+
+def _build_follows(rows, images_dir):
+    users = _users(*(
+        name for row in rows for name in (row['user'], row['author'])
+    ))
+    return [
+        Follow(
+            id=row.get('id') or None,
+            user_id=users[row['user']],
+            author_id=users[row['author']]
+        )
+        for row in rows
+        if row['user'] != row['author']
+    ]
+
+
+BUILDERS = {
+    'posts': _build_posts,
+    'comments': _build_comments,
+    'follows': _build_follows,
+}
+
+
+def import_rows(kind, rows, batch_size=1000, images_dir=None):
+    """Загрузить строки пачками и после каждой отдавать их число.
+
+    Каждая пачка — своя транзакция, поэтому прерванный импорт теряет
+    не больше одной пачки и продолжается с последней отданной позиции.
+    """
+    model = MODELS[kind]
+    for batch in chunked(rows, batch_size):
+        objects = BUILDERS[kind](batch, images_dir)
+        with manual_created(Post, Comment), transaction.atomic():
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+        if kind == 'posts' and settings.THUMBNAIL_PREGENERATE:
+            thumbnails.schedule(*{
+                post.image.name for post in objects if post.image
+            })
+        yield len(batch)
+    reset_sequences(model)
+
+
+def reset_sequences(*models):
+    """Сдвинуть последовательности id за вставленные явно (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Пересчитать то, что bulk_create пропускает мимо сигналов."""
+    counters.recount()
+    entries = timeline.rebuild()
+    search.get_backend().rebuild()
+    counting.forget('index')
+    for group_id in Group.objects.values_list('pk', flat=True):
+        counting.forget('group', group_id)
+    pagecache.purge(pages.INDEX)
+    return entries
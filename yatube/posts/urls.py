@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -18,6 +18,10 @@ urlpatterns = [
          views.profile,
          name='profile'),
 
+    path('search/',
+         views.search_posts,
+         name='search'),
+
     path('posts/<int:post_id>/',
          views.post_detail,
          name='post_detail'),
@@ -30,6 +34,10 @@ urlpatterns = [
          views.post_edit,
          name='post_edit'),
 
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
+
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
@@ -45,4 +53,20 @@ urlpatterns = [
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'),
+
+    path('api/posts/',
+         api.index,
+         name='api_index'),
+
+    path('api/group/<slug:slug>/',
+         api.group_posts,
+         name='api_group_list'),
+
+    path('api/profile/<str:username>/',
+         api.profile,
+         name='api_profile'),
+
+    path('api/follow/',
+         api.follow_index,
+         name='api_follow_index'),
 ]
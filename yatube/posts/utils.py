@@ -0,0 +1,31 @@
+from django.core.paginator import InvalidPage
+from django.http import Http404
+
+from core.paginator import CursorPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+COMMENTS_ORDERING = ('created', 'id')
+
+
+def paginate(request, queryset, per_page=POSTS_PER_PAGE, total=None,
+             approximate=False):
+    paginator = CursorPaginator(
+        queryset, per_page, total=total, approximate=approximate
+    )
+    try:
+        return paginator.get_page(
+            request.GET.get('page'),
+            cursor=request.GET.get('cursor')
+        )
+    except InvalidPage as error:
+        raise Http404(error)
+
+
+def paginate_comments(request, post):
+    paginator = CursorPaginator(
+        post.comments.for_thread(),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENTS_ORDERING
+    )
+    return paginator.cursor_page(request.GET.get('cursor'))
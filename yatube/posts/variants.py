@@ -0,0 +1,99 @@
+import hashlib
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+EXTENSIONS = {
+    'avif': 'avif',
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+# Пропорции карточки поста, как у миниатюры 960x339.
+ASPECT_RATIO = 339 / 960
+
+
+def supported_formats():
+    """Форматы из настроек, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    formats = [
+        fmt for fmt in settings.IMAGE_VARIANT_FORMATS
+        if fmt.upper() in Image.SAVE
+    ]
+    if 'jpeg' not in formats:
+        formats.append('jpeg')
+    return formats
+
+
+def file_digest(name, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as image:
+        for chunk in iter(lambda: image.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(digest, width, fmt):
+    return f'variants/{digest[:2]}/{digest}/{width}.{EXTENSIONS[fmt]}'
+
+
+def variant_url(digest, width, fmt):
+    return default_storage.url(variant_name(digest, width, fmt))
+
+
+def generate(name):
+    """Сохранить все ширины и форматы картинки и вернуть её хеш."""
+    digest = file_digest(name)
+    formats = supported_formats()
+    with default_storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = image.convert('RGB')
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        size = (width, round(width * ASPECT_RATIO))
+        resized = None
+        for fmt in formats:
+            path = variant_name(digest, width, fmt)
+            if default_storage.exists(path):
+                continue
+            if resized is None:
+                resized = ImageOps.fit(image, size, Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, fmt.upper(), quality=80)
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+    return digest
+
+
+def sources(digest):
+    """Пары (mime, srcset) для <picture>, последней идёт JPEG."""
+    return [
+        (
+            MIME_TYPES[fmt],
+            ', '.join(
+                f'{variant_url(digest, width, fmt)} {width}w'
+                for width in settings.IMAGE_VARIANT_WIDTHS
+            )
+        )
+        for fmt in supported_formats()
+    ]
+
+
+def delete(digest):
+    directory = posixpath.dirname(variant_name(digest, 0, 'jpeg'))
+    if not default_storage.exists(directory):
+        return
+    for file_name in default_storage.listdir(directory)[1]:
+        default_storage.delete(posixpath.join(directory, file_name))
@@ -1,20 +1,33 @@
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from .models import Post, Group, User, Comment, Follow
-from .forms import PostForm, CommentForm
+from .models import Post, Group, User, Follow
+from .forms import PostForm, CommentForm, SearchForm
+from .utils import POSTS_PER_PAGE, paginate, paginate_comments
+from . import counters, pages, search, timeline
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core import counting
+from core.instrumentation import query_budget
+from core.pagecache import cache_anonymous_page
+from core.routers import read_your_writes
 
 User = get_user_model()
 
 
+@query_budget(5)
+@cache_anonymous_page
 def index(request):
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.for_feed()
+    total, approximate = counting.count('index', posts)
+    page_obj = paginate(
+        request, posts, total=total, approximate=approximate
+    )
+    pages.tag_page(request, page_obj, pages.INDEX)
     context = {
         'title': title,
         'page_obj': page_obj
@@ -22,13 +35,17 @@ def index(request):
     return render(request, template, context)
 
 
+@query_budget(5)
+@cache_anonymous_page
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group').all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    total, approximate = counting.count('group', posts, group.pk)
+    page_obj = paginate(
+        request, posts, total=total, approximate=approximate
+    )
+    pages.tag_page(request, page_obj, pages.group_key(group.pk))
     context = {
         'group': group,
         'page_obj': page_obj
@@ -36,13 +53,17 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@query_budget(5)
+@cache_anonymous_page
 def profile(request, username, following=False):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    number_of_posts = posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    stats = counters.get_stats(author)
+    posts = author.posts.for_feed()
+    page_obj = paginate(request, posts, total=stats.posts_count)
+    pages.tag_page(request, page_obj, pages.author_key(author.pk))
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             author=author,
@@ -51,19 +72,23 @@ def profile(request, username, following=False):
     context = {
         'author': author,
         'username': username,
-        'number_of_posts': number_of_posts,
+        'number_of_posts': stats.posts_count,
+        'stats': stats,
         'page_obj': page_obj,
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(5)
+@cache_anonymous_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_feed(), id=post_id)
+    pages.tag_page(request, [post], pages.author_key(post.author_id))
     title = str(post.text)[:30]
-    number_of_posts = Post.objects.filter(author=post.author).count()
+    number_of_posts = counters.get_stats(post.author).posts_count
     form = CommentForm()
-    comments = Comment.objects.filter(post=post)
+    comments = paginate_comments(request, post)
     context = {
         'post': post,
         'title': title,
@@ -74,7 +99,49 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search_posts(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        results = search.get_backend().search(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author']
+        )
+        page_obj = Paginator(results, POSTS_PER_PAGE).get_page(
+            request.GET.get('page')
+        )
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'query': query.urlencode()
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(2)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = paginate_comments(request, post)
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': comments.next_cursor,
+    })
+
+
 @login_required
+@read_your_writes
+@transaction.atomic
 def post_create(request, is_edit=False):
     form = PostForm(
         request.POST or None,
@@ -92,6 +159,7 @@ def post_create(request, is_edit=False):
     return render(request, 'posts/create_post.html', context)
 
 
+@read_your_writes
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
@@ -113,6 +181,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(
@@ -126,14 +196,13 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(4)
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
     title = 'Все посты ваших подписок'
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = timeline.follow_feed(request.user).for_feed()
+    page_obj = paginate(request, posts)
     context = {
         'title': title,
         'page_obj': page_obj
@@ -142,18 +211,18 @@ def follow_index(request):
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if Follow.follow_can_be_created(request.user, author):
-        Follow.objects.create(
-            user=request.user,
-            author=author
-        )
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    Follow.objects.follow(request.user, author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    Follow.objects.unfollow(request.user, author)
     return redirect('posts:profile', username)
@@ -30,7 +30,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -43,7 +46,7 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.InstrumentedTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -58,24 +61,104 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать все шаблоны при старте воркера, см. core.warmup.
+# Имеет смысл с кэширующим загрузчиком (settings_production).
+TEMPLATE_WARMUP = False
+
+# Общий для всех воркеров кэш: CACHE_BACKEND=file|db|redis|memcached.
+# db требует manage.py createcachetable, redis — пакета django-redis,
+# memcached — pylibmc. locmem у каждого процесса свой.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, '.cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'cache_table'),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': (
+        'django.core.cache.backends.memcached.PyLibMCCache',
+        '127.0.0.1:11211',
+    ),
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]
+        ),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'yatube'),
+        'TIMEOUT': 300,
     }
 }
+if CACHE_BACKEND == 'file':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Используются core.staticfiles.CompressedManifestStaticFilesStorage при
+# manage.py collectstatic; .br пишутся, если установлен пакет brotli.
+STATIC_PURGE_CSS = ['css/bootstrap.min.css']
+# Классы, которые появляются не в шаблонах, а из кода или данных.
+STATIC_PURGE_SAFELIST = []
+STATIC_COMPRESS_MIN_SIZE = 256
+STATIC_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Отдавать STATIC_ROOT самим Django (core.views.serve_static), если перед
+# ним нет веб-сервера со своими правилами для статики.
+STATIC_SERVE = False
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# По умолчанию SQLite; для PostgreSQL задайте DB_ENGINE=
+# django.db.backends.postgresql и поставьте psycopg2 (<2.9 для Django 2.2).
+# CONN_MAX_AGE держит соединение между запросами; при пуле pgbouncer
+# в режиме transaction включите DB_PGBOUNCER=1.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
+if DB_ENGINE == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+    }
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = (
+        os.getenv('DB_PGBOUNCER', '') == '1'
+    )
+# Реплики для чтения: DB_REPLICAS=host1,host2 (для SQLite — пути к файлам,
+# локально: cp db.sqlite3 replica.sqlite3 и DB_REPLICAS=replica.sqlite3).
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = os.path.join(BASE_DIR, replica.strip())
+    else:
+        DATABASES[alias]['HOST'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи читать свои данные с основной базы.
+DATABASE_PIN_SECONDS = 5
+DATABASE_PIN_COOKIE = 'db_pin'
+# Выполняются core.signals для каждого нового соединения с SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.'
@@ -109,3 +192,82 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_CELEBRITIES_TIMEOUT = 300
+
+# Базовые версии пространств ключей core.cache: поднимите номер при деплое,
+# чтобы разом сбросить пространство (например, после смены шаблона). Без
+# деплоя пространство сбрасывает core.cache.bump.
+CACHE_NAMESPACES = {
+    'post_card': 1,
+    'timeline': 1,
+    'count': 1,
+}
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 6
+
+THUMBNAIL_PREGENERATE = True
+# THUMBNAIL_WORKER=1, если запущен manage.py process_thumbnails --loop;
+# без него варианты строит сам запрос после фиксации транзакции.
+THUMBNAIL_WORKER = os.getenv('THUMBNAIL_WORKER', '') == '1'
+THUMBNAIL_WORKERS = 2
+# Взятое задание скрыто от других обработчиков на столько секунд: упавший
+# обработчик не держит его вечно, а неудачное повторяется после паузы.
+THUMBNAIL_CLAIM_TIMEOUT = 10 * 60
+THUMBNAIL_MAX_ATTEMPTS = 5
+
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp', 'jpeg')
+
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# None — по СУБД: на SQLite индекс FTS5 (его создаёт миграция 0018),
+# на остальных posts.search.DatabaseBackend, он работает без индекса.
+POST_SEARCH_BACKEND = None
+SEARCH_MAX_WORDS = 10
+
+# Как считать посты лент для навигации, см. core.counting. Места без
+# записи считаются точным COUNT(*).
+COUNT_POLICIES = {
+    'index': 'estimate',
+    'group': 'cached',
+}
+COUNT_TIMEOUT = 60 * 60
+
+# Сжатие ответов на лету, см. core.compression. Меньшие ответы
+# и пути из COMPRESS_SKIP_PREFIXES (картинки уже сжаты) уходят как есть.
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_CONTENT_TYPES = (
+    'text/html', 'application/json', 'text/plain', 'text/css',
+    'application/javascript', 'image/svg+xml',
+)
+COMPRESS_SKIP_PREFIXES = (MEDIA_URL, STATIC_URL)
+COMPRESS_GZIP_LEVEL = 6
+# 11 годится только для сборки статики, на лету — 4-5.
+COMPRESS_BROTLI_QUALITY = 5
+
+# Кэш страниц для анонимов, см. core.pagecache.
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Метрики core.instrumentation: /metrics/ и JSON-логи каждого запроса
+# (INFO, превышения бюджета — WARNING).
+# /metrics/ видят персонал и запросы с Authorization: Bearer METRICS_TOKEN;
+# без токена — только персонал.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Включается тестовым раннером: превышение бюджета роняет тест.
+QUERY_BUDGET_RAISE = False
+TEST_RUNNER = 'core.testing.BudgetTestRunner'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,30 @@
+"""Настройки для продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Всё остальное берётся из settings.py и переменных окружения.
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES as BASE_TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['SECRET_KEY']
+
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost').split(',')
+
+# Шаблоны читаются с диска и разбираются один раз на процесс, а не на
+# каждый render; после правки шаблонов воркеры нужно перезапустить.
+TEMPLATES = copy.deepcopy(BASE_TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATE_WARMUP = True
+
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = True
@@ -1,7 +1,11 @@
-from django.contrib import admin
-from django.urls import path, include
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib import admin
+from django.urls import include, path, re_path
+
+from core.views import metrics, serve_media, serve_static
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -14,10 +18,22 @@ urlpatterns = [
     path('admin/', admin.site.urls, name='admin'),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
-    path('about/', include('about.urls', namespace='about'))
+    path('about/', include('about.urls', namespace='about')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+        settings.MEDIA_URL,
+        view=serve_media,
+        document_root=settings.MEDIA_ROOT
     )
+
+if settings.STATIC_SERVE:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+            serve_static,
+            {'document_root': settings.STATIC_ROOT}
+        ),
+    ]